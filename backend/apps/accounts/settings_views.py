@@ -8,6 +8,7 @@ from django.core.cache import cache
 from django.conf import settings as django_settings
 import json
 
+from services.settings_service import SettingsService
 from .permissions import IsAdmin
 
 
@@ -53,7 +54,6 @@ DEFAULT_SETTINGS = {
     },
 }
 
-SETTINGS_CACHE_KEY = 'system_settings'
 SETTINGS_CACHE_TIMEOUT = 60 * 60  # 1 hour
 
 
@@ -66,18 +66,7 @@ class SystemSettingsView(views.APIView):
 
     def get(self, request):
         """Get current system settings."""
-        # Try to get from cache first
-        cached_settings = cache.get(SETTINGS_CACHE_KEY)
-        if cached_settings:
-            return Response(cached_settings)
-        
-        # Try to load from database/file
-        settings_data = self._load_settings()
-        
-        # Cache the settings
-        cache.set(SETTINGS_CACHE_KEY, settings_data, SETTINGS_CACHE_TIMEOUT)
-        
-        return Response(settings_data)
+        return Response(SettingsService.get_all_settings())
 
     def put(self, request):
         """Update system settings."""
@@ -89,12 +78,9 @@ class SystemSettingsView(views.APIView):
         # Merge with defaults to ensure all keys exist
         merged_settings = self._merge_settings(DEFAULT_SETTINGS, new_settings)
         
-        # Save settings
+        # Save settings, this also invalidates the cached copy
         self._save_settings(merged_settings)
         
-        # Clear cache
-        cache.delete(SETTINGS_CACHE_KEY)
-        
         # Log the change with detailed metadata
         from apps.audit.services import AuditService
         
@@ -193,14 +179,16 @@ class SystemSettingsView(views.APIView):
                         key='system_settings',
                         defaults={'value': json.dumps(settings_data)}
                     )
+                    SettingsService.bump_settings_revision()
                     return
                 except LookupError:
                     pass
         except Exception:
             pass
         
-        # Fallback: just cache it
-        cache.set(SETTINGS_CACHE_KEY, settings_data, SETTINGS_CACHE_TIMEOUT * 24)
+        # Fallback: just cache it, under a fresh revision
+        SettingsService.bump_settings_revision()
+        cache.set(SettingsService.get_cache_key(), settings_data, SETTINGS_CACHE_TIMEOUT * 24)
 
     def _merge_settings(self, defaults, updates):
         """Deep merge settings with defaults."""
@@ -267,7 +267,7 @@ class ReportExportView(views.APIView):
             'Created At', 'Validated At', 'Expires At'
         ])
         
-        queryset = TaxFreeForm.objects.select_related('invoice__merchant', 'traveler')
+        queryset = TaxFreeForm.objects.select_related('invoice__merchant', 'traveler').defer('qr_png')
         if start_date:
             queryset = queryset.filter(created_at__date__gte=start_date)
         if end_date:
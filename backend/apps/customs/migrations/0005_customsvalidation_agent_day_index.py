@@ -0,0 +1,18 @@
+# Generated by Django 4.2.9 on 2026-10-17 10:00
+
+from django.db import migrations, models
+import django.db.models.functions.datetime
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customs', '0004_fix_duration_default'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='customsvalidation',
+            index=models.Index(models.F('agent'), django.db.models.functions.datetime.TruncDate('decided_at'), name='customs_cv_agent_day_idx'),
+        ),
+    ]
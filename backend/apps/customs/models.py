@@ -4,6 +4,7 @@ Customs validation models.
 import uuid
 from datetime import timedelta
 from django.db import models
+from django.db.models.functions import TruncDate
 from django.utils.translation import gettext_lazy as _
 
 
@@ -157,6 +158,8 @@ class CustomsValidation(models.Model):
         indexes = [
             models.Index(fields=['decided_at']),
             models.Index(fields=['offline_batch_id']),
+            # Daily report buckets: TruncDate('decided_at') per agent
+            models.Index('agent', TruncDate('decided_at'), name='customs_cv_agent_day_idx'),
         ]
 
     def __str__(self):
@@ -3,16 +3,19 @@ Views for Customs Reports API.
 Provides endpoints for dashboard stats, data lists, and Excel exports.
 All data is strictly filtered by the agent's ID - each agent sees only their own data.
 """
+import tempfile
 from datetime import datetime
 from rest_framework import views, status
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
-from django.http import HttpResponse
+from django.http import FileResponse
 from django.utils import timezone
 
 from apps.accounts.permissions import IsCustomsAgent, IsCustomsAgentOnly
 from services.reports_service import CustomsReportsService
 
+XLSX_CONTENT_TYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
 
 class ReportsBaseView(views.APIView):
     """Base view for reports with common functionality."""
@@ -34,6 +37,19 @@ class ReportsBaseView(views.APIView):
             agent_name=user.full_name
         )
     
+    def excel_response(self, generate, filename: str) -> FileResponse:
+        """
+        Write an Excel export to a temporary file and stream it back.
+        `generate` receives the file; it is deleted once the response is closed.
+        """
+        output = tempfile.TemporaryFile()
+        try:
+            generate(output)
+        except BaseException:
+            output.close()
+            raise
+        return FileResponse(output, as_attachment=True, filename=filename, content_type=XLSX_CONTENT_TYPE)
+    
     def parse_date_params(self, request) -> tuple:
         """Parse date_from and date_to from query parameters."""
         date_from = None
@@ -72,7 +88,7 @@ class ReportsDashboardView(ReportsBaseView):
             stats = service.get_dashboard_stats(date_from, date_to)
             
             # Add point of exit info
-            point_of_exit = request.user.point_of_exit
+            point_of_exit = service.point_of_exit
             stats['point_of_exit'] = {
                 'id': str(point_of_exit.id),
                 'code': point_of_exit.code,
@@ -170,20 +186,15 @@ class ReportsExportValidationsView(ReportsBaseView):
             date_from, date_to = self.parse_date_params(request)
             decision = request.query_params.get('decision')
             
-            excel_file = service.generate_validations_excel(date_from, date_to, decision)
-            
             # Generate filename
-            point_of_exit = request.user.point_of_exit
+            point_of_exit = service.point_of_exit
             date_str = timezone.now().strftime('%Y%m%d_%H%M')
             filename = f"validations_{point_of_exit.code}_{date_str}.xlsx"
             
-            response = HttpResponse(
-                excel_file.read(),
-                content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+            return self.excel_response(
+                lambda output: service.generate_validations_excel(date_from, date_to, decision, output=output),
+                filename
             )
-            response['Content-Disposition'] = f'attachment; filename="{filename}"'
-            
-            return response
         
         except ValueError as e:
             return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
@@ -198,20 +209,15 @@ class ReportsExportRefundsView(ReportsBaseView):
             date_from, date_to = self.parse_date_params(request)
             refund_status = request.query_params.get('status')
             
-            excel_file = service.generate_refunds_excel(date_from, date_to, refund_status)
-            
             # Generate filename
-            point_of_exit = request.user.point_of_exit
+            point_of_exit = service.point_of_exit
             date_str = timezone.now().strftime('%Y%m%d_%H%M')
             filename = f"remboursements_{point_of_exit.code}_{date_str}.xlsx"
             
-            response = HttpResponse(
-                excel_file.read(),
-                content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+            return self.excel_response(
+                lambda output: service.generate_refunds_excel(date_from, date_to, refund_status, output=output),
+                filename
             )
-            response['Content-Disposition'] = f'attachment; filename="{filename}"'
-            
-            return response
         
         except ValueError as e:
             return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
@@ -225,20 +231,15 @@ class ReportsExportSummaryView(ReportsBaseView):
             service = self.get_report_service(request)
             date_from, date_to = self.parse_date_params(request)
             
-            excel_file = service.generate_summary_excel(date_from, date_to)
-            
             # Generate filename
-            point_of_exit = request.user.point_of_exit
+            point_of_exit = service.point_of_exit
             date_str = timezone.now().strftime('%Y%m%d_%H%M')
             filename = f"rapport_synthese_{point_of_exit.code}_{date_str}.xlsx"
             
-            response = HttpResponse(
-                excel_file.read(),
-                content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+            return self.excel_response(
+                lambda output: service.generate_summary_excel(date_from, date_to, output=output),
+                filename
             )
-            response['Content-Disposition'] = f'attachment; filename="{filename}"'
-            
-            return response
         
         except ValueError as e:
             return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
@@ -67,10 +67,17 @@ class RefundViewSet(viewsets.ModelViewSet):
         elif not user.is_admin() and not user.is_auditor():
             queryset = queryset.none()
         
-        return queryset.select_related(
+        queryset = queryset.select_related(
             'form', 'form__traveler', 'form__invoice__merchant',
             'form__customs_validation', 'initiated_by', 'cash_collected_by', 'cancelled_by'
-        )
+        ).defer('form__qr_png')
+        if self.action in ('download_receipt', 'send_receipt'):
+            # The receipt also shows the validation details and invoice items
+            queryset = queryset.select_related(
+                'form__customs_validation__point_of_exit', 'form__customs_validation__agent'
+            ).prefetch_related(ReceiptService.items_prefetch())
+        
+        return queryset
 
     def get_permissions(self):
         if self.action in ['initiate', 'collect_cash']:
@@ -301,9 +308,7 @@ class RefundViewSet(viewsets.ModelViewSet):
             )
         
         try:
-            pdf_buffer = ReceiptService.generate_receipt_pdf(refund)
-            
-            response = HttpResponse(pdf_buffer.getvalue(), content_type='application/pdf')
+            response = HttpResponse(ReceiptService.get_receipt_bytes(refund), content_type='application/pdf')
             response['Content-Disposition'] = f'attachment; filename="recu_{refund.form.form_number}.pdf"'
             
             return response
@@ -4,6 +4,7 @@ Rule Engine models for configurable tax free rules.
 import uuid
 from decimal import Decimal
 from django.db import models
+from django.utils.functional import cached_property
 from django.utils.translation import gettext_lazy as _
 from django.core.validators import MinValueValidator, MaxValueValidator
 
@@ -150,11 +151,30 @@ class RuleSet(models.Model):
             'operator_fee_fixed': str(self.operator_fee_fixed),
         }
 
+    @cached_property
+    def active_risk_rules(self):
+        """Active risk rules, loaded once per instance (prefetched by get_active_with_risk_rules)."""
+        return list(self.risk_rules.filter(is_active=True))
+
     @classmethod
     def get_active(cls):
         """Get the currently active ruleset."""
         return cls.objects.filter(is_active=True).first()
 
+    @classmethod
+    def get_active_with_risk_rules(cls):
+        """
+        Get the currently active ruleset with its active risk rules
+        loaded in `active_risk_rules`, in two queries.
+        """
+        return cls.objects.filter(is_active=True).prefetch_related(
+            models.Prefetch(
+                'risk_rules',
+                queryset=RiskRule.objects.filter(is_active=True),
+                to_attr='active_risk_rules'
+            )
+        ).first()
+
 
 class RiskRule(models.Model):
     """Individual risk scoring rule."""
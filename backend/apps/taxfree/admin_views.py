@@ -60,7 +60,7 @@ class AdminTaxFreeFormViewSet(viewsets.ReadOnlyModelViewSet):
             'cancelled_by',
         ).prefetch_related(
             'invoice__items',
-        )
+        ).defer('qr_png')
         
         # Advanced filters from query params
         params = self.request.query_params
@@ -645,7 +645,7 @@ class AdminRefundViewSet(viewsets.ReadOnlyModelViewSet):
             'cancelled_by',
         ).prefetch_related(
             'attempts',
-        )
+        ).defer('form__qr_png')
         
         params = self.request.query_params
         
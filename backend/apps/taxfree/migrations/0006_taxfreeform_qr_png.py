@@ -0,0 +1,18 @@
+# Generated by Django 4.2.9 on 2026-10-17 12:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('taxfree', '0005_rename_taxfree_sta_form_id_a1b2c3_idx_taxfree_sta_form_id_3e9b1f_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='taxfreeform',
+            name='qr_png',
+            field=models.BinaryField(blank=True, default=b''),
+        ),
+    ]
@@ -4,6 +4,7 @@ Tax Free Form and Traveler models.
 import uuid
 import hashlib
 import hmac
+import io
 import json
 from decimal import Decimal
 from django.db import models
@@ -139,6 +140,7 @@ class TaxFreeForm(models.Model):
     # QR Code data
     qr_payload = models.TextField(blank=True)
     qr_signature = models.CharField(max_length=64, blank=True)
+    qr_png = models.BinaryField(blank=True, default=b'', editable=False)  # Rendered QR image
     
     # Rule snapshot (rules applied at creation time for audit)
     rule_snapshot = models.JSONField(default=dict)
@@ -204,7 +206,13 @@ class TaxFreeForm(models.Model):
         return f"{prefix}{suffix}"
 
     def generate_qr_payload(self):
-        """Generate QR code payload with signature."""
+        """
+        Generate QR code payload with signature.
+        
+        May re-render qr_png as well: a save() with update_fields must list
+        qr_png next to qr_payload and qr_signature, or the stored image
+        falls out of step with the payload.
+        """
         payload = {
             'form_id': str(self.id),
             'form_number': self.form_number,
@@ -221,9 +229,27 @@ class TaxFreeForm(models.Model):
             hashlib.sha256
         ).hexdigest()
         
+        qr_string = f"{payload_str}|{signature}"
+        
+        # Issuing regenerates the payload of a form created moments before;
+        # only render the image again when the encoded string changed
+        if not (self.qr_png and payload_str == self.qr_payload and signature == self.qr_signature):
+            self.qr_png = self.render_qr_png(qr_string)
         self.qr_payload = payload_str
         self.qr_signature = signature
-        return f"{payload_str}|{signature}"
+        return qr_string
+
+    @staticmethod
+    def render_qr_png(qr_string):
+        """Render a QR string to PNG bytes (transparent background) for documents."""
+        import qrcode
+        
+        qr_code = qrcode.QRCode(error_correction=qrcode.constants.ERROR_CORRECT_L, box_size=4, border=4)
+        qr_code.add_data(qr_string)
+        qr_code.make(fit=True)
+        buffer = io.BytesIO()
+        qr_code.make_image(fill_color="black", back_color="transparent").save(buffer, format='PNG')
+        return buffer.getvalue()
 
     def verify_qr_signature(self, qr_string):
         """Verify QR code signature."""
@@ -210,7 +210,10 @@ class TaxFreeFormCreateSerializer(serializers.Serializer):
         from apps.sales.models import SaleInvoice
         from services.taxfree_service import TaxFreeService
         
-        invoice = SaleInvoice.objects.get(id=validated_data['invoice_id'])
+        # Eligibility checks read the merchant and any existing form
+        invoice = SaleInvoice.objects.select_related('merchant', 'taxfree_form').get(
+            id=validated_data['invoice_id']
+        )
         traveler_data = validated_data['traveler']
         user = self.context['request'].user
         
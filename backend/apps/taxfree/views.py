@@ -135,6 +135,13 @@ class TaxFreeFormViewSet(viewsets.ModelViewSet):
         elif not user.is_admin() and not user.is_auditor():
             queryset = queryset.none()
         
+        if self.action in ('download_pdf', 'view_pdf'):
+            # PDF generation reads the invoice, merchant, outlet and traveler
+            queryset = queryset.select_related('invoice__merchant', 'invoice__outlet', 'traveler')
+        elif self.action in ('list', 'retrieve'):
+            # The serializers never return the stored QR image
+            queryset = queryset.defer('qr_png')
+        
         return queryset
 
     def create(self, request, *args, **kwargs):
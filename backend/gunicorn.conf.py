@@ -0,0 +1,17 @@
+"""
+Gunicorn configuration, picked up from the working directory.
+
+Command-line options in the start commands still apply; this file only
+adds server hooks.
+"""
+
+
+def post_worker_init(worker):
+    """Warm up the receipt PDF path once the worker has loaded Django."""
+    from reportlab.platypus.doctemplate import LayoutError
+    from services.receipt_service import ReceiptService
+    
+    try:
+        ReceiptService.warmup()
+    except (LayoutError, OSError) as e:
+        worker.log.warning(f"Receipt PDF warmup failed: {e}")
@@ -6,9 +6,41 @@ import io
 import logging
 from decimal import Decimal
 from datetime import datetime
+from types import MappingProxyType
+
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.units import mm
+from reportlab.lib.colors import HexColor, white
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_RIGHT
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
+from reportlab.graphics.barcode import qr
+from reportlab.graphics.shapes import Drawing
 
 logger = logging.getLogger(__name__)
 
+_COUNTRY_NAMES = MappingProxyType({
+    'CD': 'RD Congo',
+    'CG': 'Congo-Brazzaville',
+    'ZA': 'Afrique du Sud',
+    'FR': 'France',
+    'BE': 'Belgique',
+    'US': 'États-Unis',
+    'GB': 'Royaume-Uni',
+    'DE': 'Allemagne',
+    'CN': 'Chine',
+    'IN': 'Inde',
+    'NG': 'Nigeria',
+    'KE': 'Kenya',
+    'TZ': 'Tanzanie',
+    'UG': 'Ouganda',
+    'RW': 'Rwanda',
+    'BI': 'Burundi',
+    'AO': 'Angola',
+    'ZM': 'Zambie',
+    'AF': 'Afghanistan',
+})
+
 
 class TaxFreePDFService:
     """Service for generating professional Tax Free Form PDFs."""
@@ -31,6 +63,18 @@ class TaxFreePDFService:
     SUCCESS_COLOR = "#059669"
     WARNING_COLOR = "#d97706"
     
+    # Terms and conditions
+    TERMS_TEXT = """
+        <b>CONDITIONS GÉNÉRALES:</b><br/>
+        1. Ce bordereau est valable uniquement pour les achats effectués en République Démocratique du Congo par des non-résidents.<br/>
+        2. Le remboursement de la TVA est soumis à la validation par les services douaniers avant le départ du territoire.<br/>
+        3. Les articles doivent être présentés neufs et non utilisés lors du contrôle douanier.<br/>
+        4. Ce bordereau expire à la date indiquée ci-dessus. Aucun remboursement ne sera effectué après cette date.<br/>
+        5. Les frais de service sont non remboursables.<br/>
+        6. En cas de fraude ou de fausse déclaration, des poursuites judiciaires pourront être engagées.<br/>
+        7. Le voyageur certifie que les informations fournies sont exactes et complètes.
+        """
+    
     @classmethod
     def generate_form_pdf(cls, form):
         """
@@ -43,19 +87,6 @@ class TaxFreePDFService:
             bytes: PDF content
         """
         try:
-            from reportlab.lib.pagesizes import A4
-            from reportlab.lib.units import mm, cm
-            from reportlab.lib.colors import HexColor, black, white
-            from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-            from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_RIGHT, TA_JUSTIFY
-            from reportlab.platypus import (
-                SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle,
-                Image, PageBreak, HRFlowable
-            )
-            from reportlab.pdfgen import canvas
-            from reportlab.graphics.shapes import Drawing, Rect, Line
-            from reportlab.graphics.barcode import qr
-            
             buffer = io.BytesIO()
             
             # Page setup
@@ -176,9 +207,6 @@ class TaxFreePDFService:
             buffer.seek(0)
             return buffer.getvalue()
             
-        except ImportError as e:
-            logger.error(f"ReportLab not installed: {e}")
-            return None
         except Exception as e:
             logger.error(f"Failed to generate PDF: {str(e)}", exc_info=True)
             return None
@@ -186,11 +214,6 @@ class TaxFreePDFService:
     @classmethod
     def _build_header(cls, form, styles):
         """Build the document header with logo and platform info."""
-        from reportlab.platypus import Table, TableStyle, Paragraph
-        from reportlab.lib.colors import HexColor
-        from reportlab.lib.units import mm
-        from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_RIGHT
-        from reportlab.lib.styles import ParagraphStyle
         
         # Platform name style
         platform_style = ParagraphStyle(
@@ -249,11 +272,6 @@ class TaxFreePDFService:
     @classmethod
     def _build_form_number_box(cls, form):
         """Build the prominent form number display box."""
-        from reportlab.platypus import Table, TableStyle, Paragraph
-        from reportlab.lib.colors import HexColor, white
-        from reportlab.lib.units import mm
-        from reportlab.lib.styles import ParagraphStyle
-        from reportlab.lib.enums import TA_CENTER
         
         number_style = ParagraphStyle(
             'FormNumber',
@@ -292,13 +310,6 @@ class TaxFreePDFService:
     @classmethod
     def _build_qr_and_status_section(cls, form):
         """Build QR code and status section."""
-        from reportlab.platypus import Table, TableStyle, Paragraph, Image
-        from reportlab.lib.colors import HexColor
-        from reportlab.lib.units import mm
-        from reportlab.lib.styles import ParagraphStyle
-        from reportlab.lib.enums import TA_CENTER, TA_LEFT
-        from reportlab.graphics.barcode import qr
-        from reportlab.graphics.shapes import Drawing
         
         # Generate QR code
         qr_data = f"{form.qr_payload}|{form.qr_signature}" if form.qr_payload and form.qr_signature else form.form_number
@@ -388,10 +399,6 @@ class TaxFreePDFService:
     @classmethod
     def _build_merchant_section(cls, form):
         """Build merchant information section."""
-        from reportlab.platypus import Table, TableStyle, Paragraph
-        from reportlab.lib.colors import HexColor
-        from reportlab.lib.units import mm
-        from reportlab.lib.styles import ParagraphStyle
         
         merchant = form.invoice.merchant
         outlet = form.invoice.outlet
@@ -439,10 +446,6 @@ class TaxFreePDFService:
     @classmethod
     def _build_traveler_section(cls, form):
         """Build traveler information section."""
-        from reportlab.platypus import Table, TableStyle, Paragraph
-        from reportlab.lib.colors import HexColor
-        from reportlab.lib.units import mm
-        from reportlab.lib.styles import ParagraphStyle
         
         traveler = form.traveler
         
@@ -467,7 +470,6 @@ class TaxFreePDFService:
             passport_display = f"***{traveler.passport_number_last4}"
         
         # Get country names
-        from services.pdf_service import TaxFreePDFService
         nationality_name = cls._get_country_name(traveler.nationality)
         residence_name = cls._get_country_name(traveler.residence_country)
         passport_country_name = cls._get_country_name(traveler.passport_country)
@@ -506,11 +508,6 @@ class TaxFreePDFService:
     @classmethod
     def _build_products_table(cls, form):
         """Build the products/items table."""
-        from reportlab.platypus import Table, TableStyle, Paragraph
-        from reportlab.lib.colors import HexColor, white
-        from reportlab.lib.units import mm
-        from reportlab.lib.styles import ParagraphStyle
-        from reportlab.lib.enums import TA_CENTER, TA_RIGHT
         
         header_style = ParagraphStyle(
             'TableHeader',
@@ -611,11 +608,6 @@ class TaxFreePDFService:
     @classmethod
     def _build_financial_summary(cls, form):
         """Build the financial summary section."""
-        from reportlab.platypus import Table, TableStyle, Paragraph
-        from reportlab.lib.colors import HexColor, white
-        from reportlab.lib.units import mm
-        from reportlab.lib.styles import ParagraphStyle
-        from reportlab.lib.enums import TA_RIGHT
         
         label_style = ParagraphStyle(
             'FinLabel',
@@ -712,10 +704,6 @@ class TaxFreePDFService:
     @classmethod
     def _build_dates_section(cls, form):
         """Build dates and validity section."""
-        from reportlab.platypus import Table, TableStyle, Paragraph
-        from reportlab.lib.colors import HexColor
-        from reportlab.lib.units import mm
-        from reportlab.lib.styles import ParagraphStyle
         
         label_style = ParagraphStyle(
             'Label',
@@ -766,11 +754,6 @@ class TaxFreePDFService:
     @classmethod
     def _build_signatures_section(cls, form):
         """Build signatures and validation section."""
-        from reportlab.platypus import Table, TableStyle, Paragraph
-        from reportlab.lib.colors import HexColor
-        from reportlab.lib.units import mm
-        from reportlab.lib.styles import ParagraphStyle
-        from reportlab.lib.enums import TA_CENTER
         
         title_style = ParagraphStyle(
             'SigTitle',
@@ -822,10 +805,6 @@ class TaxFreePDFService:
     @classmethod
     def _build_terms_section(cls):
         """Build terms and conditions section."""
-        from reportlab.platypus import Table, TableStyle, Paragraph
-        from reportlab.lib.colors import HexColor
-        from reportlab.lib.units import mm
-        from reportlab.lib.styles import ParagraphStyle
         
         title_style = ParagraphStyle(
             'TermsTitle',
@@ -841,18 +820,7 @@ class TaxFreePDFService:
             leading=10
         )
         
-        terms_text = """
-        <b>CONDITIONS GÉNÉRALES:</b><br/>
-        1. Ce bordereau est valable uniquement pour les achats effectués en République Démocratique du Congo par des non-résidents.<br/>
-        2. Le remboursement de la TVA est soumis à la validation par les services douaniers avant le départ du territoire.<br/>
-        3. Les articles doivent être présentés neufs et non utilisés lors du contrôle douanier.<br/>
-        4. Ce bordereau expire à la date indiquée ci-dessus. Aucun remboursement ne sera effectué après cette date.<br/>
-        5. Les frais de service sont non remboursables.<br/>
-        6. En cas de fraude ou de fausse déclaration, des poursuites judiciaires pourront être engagées.<br/>
-        7. Le voyageur certifie que les informations fournies sont exactes et complètes.
-        """
-        
-        data = [[Paragraph(terms_text, text_style)]]
+        data = [[Paragraph(cls.TERMS_TEXT, text_style)]]
         
         table = Table(data, colWidths=[180*mm])
         table.setStyle(TableStyle([
@@ -870,11 +838,6 @@ class TaxFreePDFService:
     @classmethod
     def _build_footer(cls, form):
         """Build document footer."""
-        from reportlab.platypus import Table, TableStyle, Paragraph
-        from reportlab.lib.colors import HexColor
-        from reportlab.lib.units import mm
-        from reportlab.lib.styles import ParagraphStyle
-        from reportlab.lib.enums import TA_CENTER
         
         footer_style = ParagraphStyle(
             'Footer',
@@ -905,25 +868,4 @@ class TaxFreePDFService:
     @staticmethod
     def _get_country_name(country_code):
         """Get country name from ISO code."""
-        countries = {
-            'CD': 'RD Congo',
-            'CG': 'Congo-Brazzaville',
-            'ZA': 'Afrique du Sud',
-            'FR': 'France',
-            'BE': 'Belgique',
-            'US': 'États-Unis',
-            'GB': 'Royaume-Uni',
-            'DE': 'Allemagne',
-            'CN': 'Chine',
-            'IN': 'Inde',
-            'NG': 'Nigeria',
-            'KE': 'Kenya',
-            'TZ': 'Tanzanie',
-            'UG': 'Ouganda',
-            'RW': 'Rwanda',
-            'BI': 'Burundi',
-            'AO': 'Angola',
-            'ZM': 'Zambie',
-            'AF': 'Afghanistan',
-        }
-        return countries.get(country_code, country_code)
+        return _COUNTRY_NAMES.get(country_code, country_code)
@@ -3,9 +3,14 @@ Receipt generation service for refunds.
 """
 import io
 import base64
+import string
 from decimal import Decimal
 from datetime import datetime
+from functools import lru_cache
+from types import MappingProxyType
 from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Prefetch
 from django.utils import timezone
 from reportlab.lib import colors
 from reportlab.lib.pagesizes import A4
@@ -16,23 +21,240 @@ from reportlab.lib.enums import TA_CENTER, TA_RIGHT, TA_LEFT
 import qrcode
 import logging
 
+from apps.refunds.models import Refund, RefundStatus
+from apps.sales.models import SaleItem
+
 logger = logging.getLogger(__name__)
 
+RECEIPT_CACHE_PREFIX = 'receipt_pdf:'
+RECEIPT_CACHE_TIMEOUT = 60 * 60  # 1 hour
+
+
+# Refund method labels printed on the receipt
+_METHOD_DISPLAY = MappingProxyType({
+    'CASH': 'Espèces au guichet',
+    'CARD': 'Carte bancaire',
+    'BANK_TRANSFER': 'Virement bancaire',
+    'MOBILE_MONEY': 'Mobile Money',
+})
+
+# HTML body of the receipt email; filled in by send_receipt_email
+_RECEIPT_HTML_TMPL = string.Template("""<!DOCTYPE html>
+<html>
+<head>
+    <meta charset="UTF-8">
+    <style>
+        body { font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif; line-height: 1.6; color: #374151; }
+        .container { max-width: 600px; margin: 0 auto; padding: 20px; }
+        .header { text-align: center; padding: 20px 0; border-bottom: 2px solid #e5e7eb; }
+        .header h1 { color: #059669; margin: 0; font-size: 24px; }
+        .content { padding: 30px 0; }
+        .amount-box { background: #ecfdf5; border: 1px solid #a7f3d0; border-radius: 8px; padding: 20px; text-align: center; margin: 20px 0; }
+        .amount { font-size: 32px; font-weight: bold; color: #059669; }
+        .currency { font-size: 14px; color: #6b7280; }
+        .details { background: #f9fafb; border-radius: 8px; padding: 15px; margin: 20px 0; }
+        .details p { margin: 8px 0; }
+        .footer { text-align: center; padding: 20px 0; border-top: 1px solid #e5e7eb; color: #9ca3af; font-size: 12px; }
+    </style>
+</head>
+<body>
+    <div class="container">
+        <div class="header">
+            <h1>✅ Remboursement effectué</h1>
+            <p style="color: #6b7280; margin-top: 10px;">Votre remboursement Tax Free a été traité avec succès</p>
+        </div>
+        
+        <div class="content">
+            <p>Bonjour <strong>$first_name $last_name</strong>,</p>
+            
+            <p>Nous avons le plaisir de vous confirmer que votre remboursement de TVA a été effectué.</p>
+            
+            <div class="amount-box">
+                <div class="amount">$net_amount</div>
+                <div class="currency">$currency</div>
+            </div>
+            
+            <div class="details">
+                <p><strong>N° Bordereau:</strong> $form_number</p>
+                <p><strong>Méthode:</strong> $method</p>
+                <p><strong>Date:</strong> $paid_at</p>
+            </div>
+            
+            <p>Vous trouverez en pièce jointe votre reçu de remboursement au format PDF.</p>
+            
+            <p>Merci d'avoir utilisé notre service de détaxe. Bon voyage !</p>
+        </div>
+        
+        <div class="footer">
+            <p>© $year $app_name. Tous droits réservés.</p>
+        </div>
+    </div>
+</body>
+</html>
+""")
+
+
+@lru_cache(maxsize=64)
+def _receipt_qr_png(qr_data):
+    """PNG bytes of the receipt QR code.
+    
+    The payload is fixed once the refund is paid, so a receipt that is
+    downloaded and then emailed encodes its QR code only once.
+    """
+    qr = qrcode.QRCode(version=1, box_size=2, border=1)
+    qr.add_data(qr_data)
+    qr.make(fit=True)
+    qr_img = qr.make_image(fill_color="black", back_color="white")
+    
+    # ReportLab decodes the PNG and recompresses the pixels itself, so
+    # zlib-compressing it here would be wasted work
+    qr_buffer = io.BytesIO()
+    qr_img.save(qr_buffer, format='PNG', compress_level=0)
+    return qr_buffer.getvalue()
+
 
 class ReceiptService:
     """Service for generating refund receipts."""
     
+    # Receipt palette, parsed once
+    _C_DARK = colors.HexColor('#1f2937')
+    _C_TEXT = colors.HexColor('#374151')
+    _C_BODY = colors.HexColor('#4b5563')
+    _C_MUTED = colors.HexColor('#6b7280')
+    _C_FAINT = colors.HexColor('#9ca3af')
+    _C_BORDER = colors.HexColor('#d1d5db')
+    _C_LIGHT_BG = colors.HexColor('#f3f4f6')
+    _C_SUCCESS = colors.HexColor('#059669')
+    _C_SUCCESS_BG = colors.HexColor('#ecfdf5')
+    
+    # Paragraph styles shared by every receipt; none depend on the refund
+    _SAMPLE_STYLES = getSampleStyleSheet()
+    _STYLES = {
+        'title': ParagraphStyle(
+            'Title',
+            parent=_SAMPLE_STYLES['Heading1'],
+            fontSize=20,
+            textColor=_C_DARK,
+            alignment=TA_CENTER,
+            spaceAfter=2*mm
+        ),
+        'subtitle': ParagraphStyle(
+            'Subtitle',
+            parent=_SAMPLE_STYLES['Normal'],
+            fontSize=10,
+            textColor=_C_MUTED,
+            alignment=TA_CENTER,
+            spaceAfter=3*mm
+        ),
+        'section_title': ParagraphStyle(
+            'SectionTitle',
+            parent=_SAMPLE_STYLES['Heading2'],
+            fontSize=9,
+            textColor=_C_TEXT,
+            spaceBefore=2*mm,
+            spaceAfter=1*mm
+        ),
+        'small': ParagraphStyle(
+            'Small',
+            parent=_SAMPLE_STYLES['Normal'],
+            fontSize=7,
+            textColor=_C_FAINT,
+            alignment=TA_CENTER
+        ),
+    }
+    
+    # Table styles shared by every receipt
+    # Two-column wrappers (header info, payment & merchant)
+    _COLUMNS_TABLE_STYLE = TableStyle([
+        ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+    ])
+    # Receipt number / validation info blocks in the header
+    _INFO_TABLE_STYLE = TableStyle([
+        ('FONTNAME', (0, 0), (0, -1), 'Helvetica'),
+        ('FONTNAME', (1, 0), (1, -1), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, -1), 9),
+        ('TEXTCOLOR', (0, 0), (-1, -1), _C_TEXT),
+        ('BOTTOMPADDING', (0, 0), (-1, -1), 2),
+    ])
+    _TRAVELER_TABLE_STYLE = TableStyle([
+        ('FONTNAME', (0, 0), (0, -1), 'Helvetica'),
+        ('FONTNAME', (2, 0), (2, -1), 'Helvetica'),
+        ('FONTNAME', (1, 0), (1, -1), 'Helvetica-Bold'),
+        ('FONTNAME', (3, 0), (3, -1), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, -1), 8),
+        ('TEXTCOLOR', (0, 0), (0, -1), _C_MUTED),
+        ('TEXTCOLOR', (2, 0), (2, -1), _C_MUTED),
+        ('TEXTCOLOR', (1, 0), (1, -1), _C_DARK),
+        ('TEXTCOLOR', (3, 0), (3, -1), _C_DARK),
+        ('BOTTOMPADDING', (0, 0), (-1, -1), 2),
+    ])
+    _PRODUCTS_TABLE_STYLE = TableStyle([
+        # Header
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, 0), 7),
+        ('BACKGROUND', (0, 0), (-1, 0), _C_LIGHT_BG),
+        ('TEXTCOLOR', (0, 0), (-1, 0), _C_TEXT),
+        # Body
+        ('FONTNAME', (0, 1), (-1, -2), 'Helvetica'),
+        ('FONTSIZE', (0, 1), (-1, -1), 7),
+        ('TEXTCOLOR', (0, 1), (-1, -1), _C_BODY),
+        # Total row
+        ('FONTNAME', (0, -1), (-1, -1), 'Helvetica-Bold'),
+        ('LINEABOVE', (0, -1), (-1, -1), 0.5, _C_BORDER),
+        # Alignment
+        ('ALIGN', (1, 0), (-1, -1), 'RIGHT'),
+        ('BOTTOMPADDING', (0, 0), (-1, -1), 1),
+        ('TOPPADDING', (0, 0), (-1, -1), 1),
+    ])
+    _AMOUNT_TABLE_STYLE = TableStyle([
+        ('FONTNAME', (0, 0), (-1, 1), 'Helvetica'),
+        ('FONTNAME', (0, 2), (-1, 2), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, 1), 8),
+        ('FONTSIZE', (0, 2), (-1, 2), 11),
+        ('TEXTCOLOR', (0, 0), (-1, 1), _C_TEXT),
+        ('TEXTCOLOR', (0, 2), (-1, 2), _C_SUCCESS),
+        ('ALIGN', (1, 0), (1, -1), 'RIGHT'),
+        ('BOTTOMPADDING', (0, 0), (-1, -1), 2),
+        ('LINEABOVE', (0, 2), (-1, 2), 1, _C_BORDER),
+        ('TOPPADDING', (0, 2), (-1, 2), 4),
+        ('BACKGROUND', (0, 2), (-1, 2), _C_SUCCESS_BG),
+    ])
+    _PAYMENT_TABLE_STYLE = TableStyle([
+        ('FONTNAME', (0, 0), (0, -1), 'Helvetica'),
+        ('FONTNAME', (1, 0), (1, -1), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, -1), 8),
+        ('TEXTCOLOR', (0, 0), (0, -1), _C_MUTED),
+        ('TEXTCOLOR', (1, 0), (1, -1), _C_DARK),
+        ('TEXTCOLOR', (1, 1), (1, 1), _C_SUCCESS),
+        ('BOTTOMPADDING', (0, 0), (-1, -1), 1),
+    ])
+    _MERCHANT_TABLE_STYLE = TableStyle([
+        ('FONTNAME', (0, 0), (0, -1), 'Helvetica'),
+        ('FONTNAME', (1, 0), (1, -1), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, -1), 8),
+        ('TEXTCOLOR', (0, 0), (0, -1), _C_MUTED),
+        ('TEXTCOLOR', (1, 0), (1, -1), _C_DARK),
+        ('BOTTOMPADDING', (0, 0), (-1, -1), 1),
+    ])
+    _QR_TABLE_STYLE = TableStyle([
+        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+    ])
+    
     @classmethod
     def generate_receipt_pdf(cls, refund):
         """
         Generate a professional PDF receipt for a refund.
         
         Args:
-            refund: Refund instance (must be PAID status)
+            refund: Refund instance (must be PAID status), or its id; an id
+                is loaded with every relation the receipt reads
             
         Returns:
             BytesIO buffer containing the PDF
         """
+        if not isinstance(refund, Refund):
+            refund = cls._load_refund(refund)
+        
         buffer = io.BytesIO()
         
         # Create document - compact margins
@@ -46,51 +268,11 @@ class ReceiptService:
         )
         
         # Styles
-        styles = getSampleStyleSheet()
-        
-        # Custom styles - compact
-        title_style = ParagraphStyle(
-            'Title',
-            parent=styles['Heading1'],
-            fontSize=20,
-            textColor=colors.HexColor('#1f2937'),
-            alignment=TA_CENTER,
-            spaceAfter=2*mm
-        )
-        
-        subtitle_style = ParagraphStyle(
-            'Subtitle',
-            parent=styles['Normal'],
-            fontSize=10,
-            textColor=colors.HexColor('#6b7280'),
-            alignment=TA_CENTER,
-            spaceAfter=3*mm
-        )
-        
-        section_title_style = ParagraphStyle(
-            'SectionTitle',
-            parent=styles['Heading2'],
-            fontSize=9,
-            textColor=colors.HexColor('#374151'),
-            spaceBefore=2*mm,
-            spaceAfter=1*mm
-        )
-        
-        normal_style = ParagraphStyle(
-            'CustomNormal',
-            parent=styles['Normal'],
-            fontSize=9,
-            textColor=colors.HexColor('#374151'),
-            leading=11
-        )
-        
-        small_style = ParagraphStyle(
-            'Small',
-            parent=styles['Normal'],
-            fontSize=7,
-            textColor=colors.HexColor('#9ca3af'),
-            alignment=TA_CENTER
-        )
+        styles = cls._STYLES
+        title_style = styles['title']
+        subtitle_style = styles['subtitle']
+        section_title_style = styles['section_title']
+        small_style = styles['small']
         
         # Build content
         elements = []
@@ -109,10 +291,15 @@ class ReceiptService:
         elements.append(Paragraph("REÇU DE REMBOURSEMENT", title_style))
         elements.append(Paragraph("Tax Free - Détaxe Touristique", subtitle_style))
         
+        # Timestamps printed on the receipt, formatted once
+        now = timezone.now()
+        paid_at_long = (refund.paid_at or now).strftime('%d/%m/%Y à %H:%M')
+        paid_at_short = refund.paid_at.strftime('%d/%m/%Y %H:%M') if refund.paid_at else '-'
+        
         # Receipt number and date - compact two columns
         left_info = [
-            ['N° Reçu:', f'REC-{str(refund.id)[:8].upper()}'],
-            ['Date:', refund.paid_at.strftime('%d/%m/%Y à %H:%M') if refund.paid_at else timezone.now().strftime('%d/%m/%Y à %H:%M')],
+            ['N° Reçu:', f'REC-{refund.id.hex[:8].upper()}'],
+            ['Date:', paid_at_long],
             ['N° Bordereau:', form.form_number],
         ]
         
@@ -122,36 +309,22 @@ class ReceiptService:
                 right_info.append(['Frontière:', validation.point_of_exit.name])
             if validation.agent:
                 # Use agent_code from DB if available, otherwise generate from ID
-                agent_code = validation.agent.agent_code or f"AG-{str(validation.agent.id)[:6].upper()}"
+                agent_code = validation.agent.agent_code or f"AG-{validation.agent.id.hex[:6].upper()}"
                 right_info.append(['Code Agent:', agent_code])
             right_info.append(['Validé le:', validation.decided_at.strftime('%d/%m/%Y à %H:%M') if validation.decided_at else '-'])
         
         # Create two-column layout for header info
         left_table = Table(left_info, colWidths=[2.5*cm, 4.5*cm])
-        left_table.setStyle(TableStyle([
-            ('FONTNAME', (0, 0), (0, -1), 'Helvetica'),
-            ('FONTNAME', (1, 0), (1, -1), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, -1), 9),
-            ('TEXTCOLOR', (0, 0), (-1, -1), colors.HexColor('#374151')),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 2),
-        ]))
+        left_table.setStyle(cls._INFO_TABLE_STYLE)
         
         if right_info:
             right_table = Table(right_info, colWidths=[2.5*cm, 4.5*cm])
-            right_table.setStyle(TableStyle([
-                ('FONTNAME', (0, 0), (0, -1), 'Helvetica'),
-                ('FONTNAME', (1, 0), (1, -1), 'Helvetica-Bold'),
-                ('FONTSIZE', (0, 0), (-1, -1), 9),
-                ('TEXTCOLOR', (0, 0), (-1, -1), colors.HexColor('#374151')),
-                ('BOTTOMPADDING', (0, 0), (-1, -1), 2),
-            ]))
+            right_table.setStyle(cls._INFO_TABLE_STYLE)
             header_table = Table([[left_table, right_table]], colWidths=[8*cm, 8*cm])
         else:
             header_table = Table([[left_table]], colWidths=[16*cm])
         
-        header_table.setStyle(TableStyle([
-            ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-        ]))
+        header_table.setStyle(cls._COLUMNS_TABLE_STYLE)
         elements.append(header_table)
         elements.append(Spacer(1, 2*mm))
         
@@ -166,28 +339,18 @@ class ReceiptService:
             traveler_data.append(['Tél:', traveler.phone, '', ''])
         
         traveler_table = Table(traveler_data, colWidths=[2*cm, 5.5*cm, 2*cm, 5.5*cm])
-        traveler_table.setStyle(TableStyle([
-            ('FONTNAME', (0, 0), (0, -1), 'Helvetica'),
-            ('FONTNAME', (2, 0), (2, -1), 'Helvetica'),
-            ('FONTNAME', (1, 0), (1, -1), 'Helvetica-Bold'),
-            ('FONTNAME', (3, 0), (3, -1), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, -1), 8),
-            ('TEXTCOLOR', (0, 0), (0, -1), colors.HexColor('#6b7280')),
-            ('TEXTCOLOR', (2, 0), (2, -1), colors.HexColor('#6b7280')),
-            ('TEXTCOLOR', (1, 0), (1, -1), colors.HexColor('#1f2937')),
-            ('TEXTCOLOR', (3, 0), (3, -1), colors.HexColor('#1f2937')),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 2),
-        ]))
+        traveler_table.setStyle(cls._TRAVELER_TABLE_STYLE)
         elements.append(traveler_table)
         
-        # Products section
-        if form.invoice and form.invoice.items.exists():
+        # Products section - limited to 5 items for space
+        items = list(form.invoice.items.all()[:5]) if form.invoice else []
+        if items:
             elements.append(Paragraph("PRODUITS ACHETÉS", section_title_style))
             
             # Table header
             products_data = [['Produit', 'Qté', 'Prix unit.', 'Total']]
             
-            for item in form.invoice.items.all()[:5]:  # Limit to 5 items for space
+            for item in items:
                 products_data.append([
                     item.product_name[:30] + ('...' if len(item.product_name) > 30 else ''),
                     f'{item.quantity:,.0f}',
@@ -199,24 +362,7 @@ class ReceiptService:
             products_data.append(['', '', 'Total HT:', f'{form.invoice.subtotal:,.0f} {refund.currency}'])
             
             products_table = Table(products_data, colWidths=[8*cm, 1.5*cm, 2.5*cm, 3*cm])
-            products_table.setStyle(TableStyle([
-                # Header
-                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                ('FONTSIZE', (0, 0), (-1, 0), 7),
-                ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#f3f4f6')),
-                ('TEXTCOLOR', (0, 0), (-1, 0), colors.HexColor('#374151')),
-                # Body
-                ('FONTNAME', (0, 1), (-1, -2), 'Helvetica'),
-                ('FONTSIZE', (0, 1), (-1, -1), 7),
-                ('TEXTCOLOR', (0, 1), (-1, -1), colors.HexColor('#4b5563')),
-                # Total row
-                ('FONTNAME', (0, -1), (-1, -1), 'Helvetica-Bold'),
-                ('LINEABOVE', (0, -1), (-1, -1), 0.5, colors.HexColor('#d1d5db')),
-                # Alignment
-                ('ALIGN', (1, 0), (-1, -1), 'RIGHT'),
-                ('BOTTOMPADDING', (0, 0), (-1, -1), 1),
-                ('TOPPADDING', (0, 0), (-1, -1), 1),
-            ]))
+            products_table.setStyle(cls._PRODUCTS_TABLE_STYLE)
             elements.append(products_table)
         
         # Amount section - highlighted
@@ -229,33 +375,14 @@ class ReceiptService:
         ]
         
         amount_table = Table(amount_data, colWidths=[6*cm, 7*cm])
-        amount_table.setStyle(TableStyle([
-            ('FONTNAME', (0, 0), (-1, 1), 'Helvetica'),
-            ('FONTNAME', (0, 2), (-1, 2), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, 1), 8),
-            ('FONTSIZE', (0, 2), (-1, 2), 11),
-            ('TEXTCOLOR', (0, 0), (-1, 1), colors.HexColor('#374151')),
-            ('TEXTCOLOR', (0, 2), (-1, 2), colors.HexColor('#059669')),
-            ('ALIGN', (1, 0), (1, -1), 'RIGHT'),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 2),
-            ('LINEABOVE', (0, 2), (-1, 2), 1, colors.HexColor('#d1d5db')),
-            ('TOPPADDING', (0, 2), (-1, 2), 4),
-            ('BACKGROUND', (0, 2), (-1, 2), colors.HexColor('#ecfdf5')),
-        ]))
+        amount_table.setStyle(cls._AMOUNT_TABLE_STYLE)
         elements.append(amount_table)
         
-        method_display = {
-            'CASH': 'Espèces au guichet',
-            'CARD': 'Carte bancaire',
-            'BANK_TRANSFER': 'Virement bancaire',
-            'MOBILE_MONEY': 'Mobile Money'
-        }
-        
         # Payment and Merchant in two columns
         payment_data = [
-            ['Méthode:', method_display.get(refund.method, refund.method)],
+            ['Méthode:', _METHOD_DISPLAY.get(refund.method, refund.method)],
             ['Statut:', 'PAYÉ ✓'],
-            ['Date:', refund.paid_at.strftime('%d/%m/%Y %H:%M') if refund.paid_at else '-'],
+            ['Date:', paid_at_short],
         ]
         
         merchant_data = [
@@ -265,31 +392,14 @@ class ReceiptService:
         ]
         
         payment_table = Table(payment_data, colWidths=[2*cm, 5*cm])
-        payment_table.setStyle(TableStyle([
-            ('FONTNAME', (0, 0), (0, -1), 'Helvetica'),
-            ('FONTNAME', (1, 0), (1, -1), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, -1), 8),
-            ('TEXTCOLOR', (0, 0), (0, -1), colors.HexColor('#6b7280')),
-            ('TEXTCOLOR', (1, 0), (1, -1), colors.HexColor('#1f2937')),
-            ('TEXTCOLOR', (1, 1), (1, 1), colors.HexColor('#059669')),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 1),
-        ]))
+        payment_table.setStyle(cls._PAYMENT_TABLE_STYLE)
         
         merchant_table = Table(merchant_data, colWidths=[2.5*cm, 5*cm])
-        merchant_table.setStyle(TableStyle([
-            ('FONTNAME', (0, 0), (0, -1), 'Helvetica'),
-            ('FONTNAME', (1, 0), (1, -1), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, -1), 8),
-            ('TEXTCOLOR', (0, 0), (0, -1), colors.HexColor('#6b7280')),
-            ('TEXTCOLOR', (1, 0), (1, -1), colors.HexColor('#1f2937')),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 1),
-        ]))
+        merchant_table.setStyle(cls._MERCHANT_TABLE_STYLE)
         
         # Combine payment and merchant in two columns
         combined_table = Table([[payment_table, merchant_table]], colWidths=[8*cm, 8*cm])
-        combined_table.setStyle(TableStyle([
-            ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-        ]))
+        combined_table.setStyle(cls._COLUMNS_TABLE_STYLE)
         elements.append(Paragraph("PAIEMENT & COMMERÇANT", section_title_style))
         elements.append(combined_table)
         
@@ -297,27 +407,16 @@ class ReceiptService:
         elements.append(Spacer(1, 2*mm))
         
         qr_data = f"RECEIPT:{refund.id}|FORM:{form.form_number}|AMOUNT:{refund.net_amount}|DATE:{refund.paid_at.isoformat() if refund.paid_at else ''}"
-        qr = qrcode.QRCode(version=1, box_size=2, border=1)
-        qr.add_data(qr_data)
-        qr.make(fit=True)
-        qr_img = qr.make_image(fill_color="black", back_color="white")
-        
-        qr_buffer = io.BytesIO()
-        qr_img.save(qr_buffer, format='PNG')
-        qr_buffer.seek(0)
-        
-        qr_image = Image(qr_buffer, width=2*cm, height=2*cm)
+        qr_image = Image(io.BytesIO(_receipt_qr_png(qr_data)), width=2*cm, height=2*cm)
         
         qr_table = Table([[qr_image]], colWidths=[17*cm])
-        qr_table.setStyle(TableStyle([
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-        ]))
+        qr_table.setStyle(cls._QR_TABLE_STYLE)
         elements.append(qr_table)
         
         # Footer - compact
         elements.append(Spacer(1, 2*mm))
         elements.append(Paragraph(
-            f"Ce reçu atteste du remboursement effectué dans le cadre du programme de détaxe touristique. © {timezone.now().year} {getattr(settings, 'APP_NAME', 'Tax Free RDC')}",
+            f"Ce reçu atteste du remboursement effectué dans le cadre du programme de détaxe touristique. © {now.year} {getattr(settings, 'APP_NAME', 'Tax Free RDC')}",
             small_style
         ))
         
@@ -327,11 +426,63 @@ class ReceiptService:
         
         return buffer
     
+    @classmethod
+    def warmup(cls):
+        """
+        Build a throwaway receipt-like PDF to pay ReportLab's cold-start cost.
+        
+        The first document in a process loads font metrics, the PNG decoder
+        and the table layout code; called from the gunicorn post_worker_init
+        hook (gunicorn.conf.py) so that cost is not paid by the first receipt
+        a (recycled) web worker serves. Touches no database.
+        """
+        qr_image = Image(io.BytesIO(_receipt_qr_png('RECEIPT:WARMUP')), width=2*cm, height=2*cm)
+        table = Table([['Reçu', 'REMBOURSEMENT'], [qr_image, '']], colWidths=[6*cm, 7*cm])
+        table.setStyle(cls._AMOUNT_TABLE_STYLE)
+        
+        doc = SimpleDocTemplate(io.BytesIO(), pagesize=A4)
+        doc.build([Paragraph('REÇU', cls._STYLES['title']), table])
+    
+    @staticmethod
+    def _load_refund(refund_id):
+        """Fetch a refund with its form, traveler, validation and invoice items."""
+        return Refund.objects.select_related(
+            'form__traveler', 'form__invoice__merchant',
+            'form__customs_validation__point_of_exit', 'form__customs_validation__agent'
+        ).prefetch_related(ReceiptService.items_prefetch()).get(id=refund_id)
+    
+    @staticmethod
+    def items_prefetch():
+        """Prefetch of the invoice items shown on a receipt, for Refund querysets."""
+        return Prefetch(
+            'form__invoice__items',
+            queryset=SaleItem.objects.only(
+                'invoice', 'product_name', 'quantity', 'unit_price', 'line_total'
+            )
+        )
+    
     @classmethod
     def generate_receipt_base64(cls, refund):
         """Generate receipt and return as base64 string."""
-        buffer = cls.generate_receipt_pdf(refund)
-        return base64.b64encode(buffer.getvalue()).decode('utf-8')
+        return base64.b64encode(cls.get_receipt_bytes(refund)).decode('utf-8')
+    
+    @classmethod
+    def get_receipt_bytes(cls, refund):
+        """
+        Receipt PDF bytes, cached for paid refunds.
+        
+        A paid refund no longer changes, so downloading, re-sending or
+        previewing its receipt reuses the rendered PDF. The payment time and
+        net amount are part of the key, so a corrected refund re-renders.
+        """
+        if refund.status != RefundStatus.PAID:
+            return cls.generate_receipt_pdf(refund).getvalue()
+        
+        paid_at = refund.paid_at.isoformat() if refund.paid_at else ''
+        key = f"{RECEIPT_CACHE_PREFIX}{refund.id}:{paid_at}:{refund.net_amount}"
+        return cache.get_or_set(
+            key, lambda: cls.generate_receipt_pdf(refund).getvalue(), RECEIPT_CACHE_TIMEOUT
+        )
     
     @classmethod
     def send_receipt_email(cls, refund):
@@ -344,8 +495,6 @@ class ReceiptService:
         Returns:
             bool indicating success
         """
-        from django.core.mail import EmailMultiAlternatives
-        
         traveler = refund.form.traveler
         
         if not traveler.email:
@@ -353,79 +502,7 @@ class ReceiptService:
             return False
         
         try:
-            # Generate PDF
-            pdf_buffer = cls.generate_receipt_pdf(refund)
-            
-            subject = f"🧾 Reçu de remboursement Tax Free - {refund.form.form_number}"
-            
-            html_content = f"""
-            <!DOCTYPE html>
-            <html>
-            <head>
-                <meta charset="UTF-8">
-                <style>
-                    body {{ font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif; line-height: 1.6; color: #374151; }}
-                    .container {{ max-width: 600px; margin: 0 auto; padding: 20px; }}
-                    .header {{ text-align: center; padding: 20px 0; border-bottom: 2px solid #e5e7eb; }}
-                    .header h1 {{ color: #059669; margin: 0; font-size: 24px; }}
-                    .content {{ padding: 30px 0; }}
-                    .amount-box {{ background: #ecfdf5; border: 1px solid #a7f3d0; border-radius: 8px; padding: 20px; text-align: center; margin: 20px 0; }}
-                    .amount {{ font-size: 32px; font-weight: bold; color: #059669; }}
-                    .currency {{ font-size: 14px; color: #6b7280; }}
-                    .details {{ background: #f9fafb; border-radius: 8px; padding: 15px; margin: 20px 0; }}
-                    .details p {{ margin: 8px 0; }}
-                    .footer {{ text-align: center; padding: 20px 0; border-top: 1px solid #e5e7eb; color: #9ca3af; font-size: 12px; }}
-                </style>
-            </head>
-            <body>
-                <div class="container">
-                    <div class="header">
-                        <h1>✅ Remboursement effectué</h1>
-                        <p style="color: #6b7280; margin-top: 10px;">Votre remboursement Tax Free a été traité avec succès</p>
-                    </div>
-                    
-                    <div class="content">
-                        <p>Bonjour <strong>{traveler.first_name} {traveler.last_name}</strong>,</p>
-                        
-                        <p>Nous avons le plaisir de vous confirmer que votre remboursement de TVA a été effectué.</p>
-                        
-                        <div class="amount-box">
-                            <div class="amount">{refund.net_amount:,.2f}</div>
-                            <div class="currency">{refund.currency}</div>
-                        </div>
-                        
-                        <div class="details">
-                            <p><strong>N° Bordereau:</strong> {refund.form.form_number}</p>
-                            <p><strong>Méthode:</strong> {refund.get_method_display()}</p>
-                            <p><strong>Date:</strong> {refund.paid_at.strftime('%d/%m/%Y à %H:%M') if refund.paid_at else '-'}</p>
-                        </div>
-                        
-                        <p>Vous trouverez en pièce jointe votre reçu de remboursement au format PDF.</p>
-                        
-                        <p>Merci d'avoir utilisé notre service de détaxe. Bon voyage !</p>
-                    </div>
-                    
-                    <div class="footer">
-                        <p>© {timezone.now().year} {getattr(settings, 'APP_NAME', 'Tax Free RDC')}. Tous droits réservés.</p>
-                    </div>
-                </div>
-            </body>
-            </html>
-            """
-            
-            msg = EmailMultiAlternatives(
-                subject,
-                f"Votre remboursement de {refund.net_amount} {refund.currency} a été effectué. Bordereau: {refund.form.form_number}",
-                settings.DEFAULT_FROM_EMAIL,
-                [traveler.email]
-            )
-            msg.attach_alternative(html_content, "text/html")
-            msg.attach(
-                f'recu_remboursement_{refund.form.form_number}.pdf',
-                pdf_buffer.getvalue(),
-                'application/pdf'
-            )
-            
+            msg = cls._build_receipt_email(refund, cls.get_receipt_bytes(refund))
             msg.send(fail_silently=False)
             logger.info(f"Receipt email sent to {traveler.email} for refund {refund.id}")
             
@@ -434,3 +511,38 @@ class ReceiptService:
         except Exception as e:
             logger.error(f"Failed to send receipt email: {e}", exc_info=True)
             return False
+    
+    @classmethod
+    def _build_receipt_email(cls, refund, pdf_content):
+        """Build the receipt email for a refund, with its PDF attached."""
+        from django.core.mail import EmailMultiAlternatives
+        
+        traveler = refund.form.traveler
+        
+        subject = f"🧾 Reçu de remboursement Tax Free - {refund.form.form_number}"
+        
+        html_content = _RECEIPT_HTML_TMPL.substitute(
+            first_name=traveler.first_name,
+            last_name=traveler.last_name,
+            net_amount=f'{refund.net_amount:,.2f}',
+            currency=refund.currency,
+            form_number=refund.form.form_number,
+            method=refund.get_method_display(),
+            paid_at=refund.paid_at.strftime('%d/%m/%Y à %H:%M') if refund.paid_at else '-',
+            year=timezone.now().year,
+            app_name=getattr(settings, 'APP_NAME', 'Tax Free RDC'),
+        )
+        
+        msg = EmailMultiAlternatives(
+            subject,
+            f"Votre remboursement de {refund.net_amount} {refund.currency} a été effectué. Bordereau: {refund.form.form_number}",
+            settings.DEFAULT_FROM_EMAIL,
+            [traveler.email]
+        )
+        msg.attach_alternative(html_content, "text/html")
+        msg.attach(
+            f'recu_remboursement_{refund.form.form_number}.pdf',
+            pdf_content,
+            'application/pdf'
+        )
+        return msg
@@ -1,6 +1,7 @@
 """
 Refund business logic service.
 """
+import logging
 from decimal import Decimal
 from datetime import timedelta
 from django.utils import timezone
@@ -10,10 +11,18 @@ from apps.refunds.models import Refund, PaymentAttempt, RefundStatus, RefundMeth
 from apps.taxfree.models import TaxFreeForm, TaxFreeFormStatus
 from apps.audit.services import AuditService
 
+logger = logging.getLogger(__name__)
+
 
 class RefundService:
     """Service for refund operations."""
     
+    # PaymentAttempt fields set once the provider has answered
+    _ATTEMPT_RESULT_FIELDS = [
+        'provider_request_id', 'provider_response_id', 'request_payload', 'response_payload',
+        'status', 'error_code', 'error_message', 'completed_at',
+    ]
+    
     @classmethod
     def create_refund(cls, form, method, payment_details, user, payout_currency_code=None):
         """
@@ -85,20 +94,22 @@ class RefundService:
         if refund.status not in [RefundStatus.PENDING, RefundStatus.FAILED]:
             raise ValueError("Refund cannot be processed in current status")
         
-        # Update status to initiated
-        refund.status = RefundStatus.INITIATED
-        refund.initiated_at = timezone.now()
-        refund.save()
-        
         # Get appropriate provider
         provider = get_payment_provider(refund.method)
         
-        # Create payment attempt
-        attempt = PaymentAttempt.objects.create(
-            refund=refund,
-            provider=provider.name,
-            status=PaymentAttemptStatus.PENDING
-        )
+        # Update status to initiated and record the attempt before calling
+        # the provider, in one transaction
+        with transaction.atomic():
+            refund.status = RefundStatus.INITIATED
+            refund.initiated_at = timezone.now()
+            refund.save(update_fields=['status', 'initiated_at', 'updated_at'])
+            
+            # Create payment attempt
+            attempt = PaymentAttempt.objects.create(
+                refund=refund,
+                provider=provider.name,
+                status=PaymentAttemptStatus.PENDING
+            )
         
         try:
             # Process payment
@@ -118,24 +129,27 @@ class RefundService:
             if result['success']:
                 attempt.status = PaymentAttemptStatus.SUCCESS
                 attempt.completed_at = timezone.now()
-                attempt.save()
                 
                 # For CASH payments, keep status as INITIATED until manual collection
                 if refund.method == RefundMethod.CASH:
                     # Cash stays INITIATED - will be marked PAID when collected
+                    attempt.save(update_fields=cls._ATTEMPT_RESULT_FIELDS)
                     return True
                 
-                # For other methods, mark as PAID immediately
-                refund.status = RefundStatus.PAID
-                refund.paid_at = timezone.now()
-                refund.save()
-                
-                # Update form status to REFUNDED
-                refund.form.status = TaxFreeFormStatus.REFUNDED
-                refund.form.save(update_fields=['status'])
-                
-                # Send notification
-                cls._send_refund_notification(refund, 'paid')
+                with transaction.atomic():
+                    attempt.save(update_fields=cls._ATTEMPT_RESULT_FIELDS)
+                    
+                    # For other methods, mark as PAID immediately
+                    refund.status = RefundStatus.PAID
+                    refund.paid_at = timezone.now()
+                    refund.save(update_fields=['status', 'paid_at', 'updated_at'])
+                    
+                    # Update form status to REFUNDED
+                    refund.form.status = TaxFreeFormStatus.REFUNDED
+                    refund.form.save(update_fields=['status'])
+                    
+                    # Send notification
+                    cls._send_refund_notification(refund, 'paid')
                 
                 return True
             else:
@@ -143,13 +157,7 @@ class RefundService:
                 attempt.error_code = result.get('error_code', 'UNKNOWN')
                 attempt.error_message = result.get('error_message', 'Unknown error')
                 attempt.completed_at = timezone.now()
-                attempt.save()
-                
-                # Update refund
-                refund.status = RefundStatus.FAILED
-                refund.retry_count += 1
-                refund.next_retry_at = timezone.now() + timedelta(hours=4)
-                refund.save()
+                cls._record_failure(refund, attempt)
                 
                 return False
                 
@@ -158,25 +166,54 @@ class RefundService:
             attempt.error_code = 'EXCEPTION'
             attempt.error_message = str(e)
             attempt.completed_at = timezone.now()
-            attempt.save()
+            cls._record_failure(refund, attempt)
+            
+            return False
+    
+    @classmethod
+    def _record_failure(cls, refund, attempt):
+        """Save a failed attempt and schedule the refund for retry, in one transaction."""
+        with transaction.atomic():
+            attempt.save(update_fields=cls._ATTEMPT_RESULT_FIELDS)
             
             refund.status = RefundStatus.FAILED
             refund.retry_count += 1
             refund.next_retry_at = timezone.now() + timedelta(hours=4)
-            refund.save()
-            
-            return False
+            refund.save(update_fields=['status', 'retry_count', 'next_retry_at', 'updated_at'])
     
     @classmethod
     def _send_refund_notification(cls, refund, event):
         """Send notification about refund status."""
-        from apps.notifications.models import OutboundNotification, NotificationType, NotificationStatus
+        cls.send_refund_notifications_bulk([refund], event)
+    
+    @classmethod
+    def send_refund_notifications_bulk(cls, refunds, event='paid'):
+        """
+        Queue refund status notifications for several refunds at once.
+        
+        Settings are read once and every email/SMS notification is written
+        with a single bulk INSERT.
+        """
+        from apps.notifications.models import OutboundNotification
         from services.settings_service import SettingsService
         
         # Check if notifications are enabled
         if not SettingsService.should_notify_on_refund():
             return
         
+        sms_enabled = SettingsService.is_sms_notifications_enabled()
+        notifications = []
+        for refund in refunds:
+            notifications.extend(cls._build_refund_notifications(refund, event, sms_enabled))
+        
+        if notifications:
+            OutboundNotification.objects.bulk_create(notifications)
+    
+    @staticmethod
+    def _build_refund_notifications(refund, event, sms_enabled):
+        """Build (unsaved) notifications about a refund status for its traveler."""
+        from apps.notifications.models import OutboundNotification, NotificationType
+        
         traveler = refund.form.traveler
         
         if event == 'paid':
@@ -193,11 +230,13 @@ Méthode: {refund.get_method_display()}
 Merci d'avoir utilisé notre service Tax Free.
             """.strip()
         else:
-            return
+            return []
+        
+        notifications = []
         
         # Create email notification
         if traveler.email:
-            OutboundNotification.objects.create(
+            notifications.append(OutboundNotification(
                 user=None,
                 email=traveler.email,
                 type=NotificationType.EMAIL,
@@ -205,16 +244,18 @@ Merci d'avoir utilisé notre service Tax Free.
                 body=body,
                 related_entity='Refund',
                 related_entity_id=str(refund.id)
-            )
+            ))
         
         # Create SMS notification (only if SMS is enabled)
-        if traveler.phone and SettingsService.is_sms_notifications_enabled():
+        if traveler.phone and sms_enabled:
             sms_body = f"Tax Free: Remboursement {refund.form.form_number} effectué. Montant: {refund.net_amount} {refund.currency}"
-            OutboundNotification.objects.create(
+            notifications.append(OutboundNotification(
                 user=None,
                 phone=traveler.phone,
                 type=NotificationType.SMS,
                 body=sms_body,
                 related_entity='Refund',
                 related_entity_id=str(refund.id)
-            )
+            ))
+        
+        return notifications
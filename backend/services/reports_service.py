@@ -4,19 +4,31 @@ Provides data aggregation and Excel export functionality.
 All data is strictly filtered by the agent's ID - each agent sees only their own data.
 """
 import io
+from types import MappingProxyType
 from datetime import datetime, timedelta
 from decimal import Decimal
-from typing import Dict, List, Any, Optional
-from django.db.models import Sum, Count, Avg, Q, F
-from django.db.models.functions import TruncDate, TruncMonth
+from typing import Dict, List, Any, BinaryIO, Iterator, Optional
+from django.db.models import Sum, Count, Avg, Q, F, Prefetch, FloatField
+from django.db.models.functions import Cast, TruncDate, TruncMonth
 from django.utils import timezone
-from openpyxl import Workbook
-from openpyxl.styles import Font, Alignment, Border, Side, PatternFill
-from openpyxl.utils import get_column_letter
+import xlsxwriter
 
 from apps.customs.models import CustomsValidation, PointOfExit, ValidationDecision, AgentShift
 from apps.taxfree.models import TaxFreeForm, TaxFreeFormStatus
-from apps.refunds.models import Refund, RefundStatus
+from apps.refunds.models import Refund, RefundStatus, RefundMethod, PaymentAttempt
+
+# Summary export layout. XlsxWriter formats belong to one workbook, so the
+# shared pieces are their property maps, passed to add_format per export.
+_SUMMARY_HEADER_FORMAT = MappingProxyType({'bold': True, 'font_color': '#FFFFFF', 'bg_color': '#1E40AF'})
+_SUMMARY_TITLE_FORMAT = MappingProxyType({'bold': True, 'font_size': 16})
+_SUMMARY_SECTION_FORMAT = MappingProxyType({'bold': True, 'font_size': 12})
+_SUMMARY_COLUMN_WIDTHS = (30, 20)
+# Rows written by the validations and refunds Excel exports
+_EXPORT_ROW_LIMIT = 10000
+_DAILY_HEADERS = (
+    "Date", "Total", "Validés", "Refusés", "Remboursés", "Montant Validé (CDF)", "Montant Remboursé (CDF)",
+)
+_DAILY_COLUMN_WIDTHS = (12, 10, 10, 10, 12, 18, 20)
 
 
 class CustomsReportsService:
@@ -39,11 +51,13 @@ class CustomsReportsService:
         self.agent_id = agent_id
         self.point_of_exit_id = point_of_exit_id
         self.agent_name = agent_name
-        self._validate_point_of_exit()
+        self.point_of_exit = self._get_point_of_exit()
     
-    def _validate_point_of_exit(self):
-        """Validate that the point of exit exists."""
-        if not PointOfExit.objects.filter(id=self.point_of_exit_id).exists():
+    def _get_point_of_exit(self) -> PointOfExit:
+        """Fetch the point of exit once; reports only read its identity fields."""
+        try:
+            return PointOfExit.objects.only('id', 'code', 'name', 'type').get(id=self.point_of_exit_id)
+        except PointOfExit.DoesNotExist:
             raise ValueError("Point of exit not found")
     
     # ==================== DASHBOARD STATISTICS ====================
@@ -61,47 +75,46 @@ class CustomsReportsService:
         """
         validations = self._get_validations_queryset(date_from, date_to)
         
-        # Basic counts
-        total_validations = validations.count()
-        validated_count = validations.filter(decision=ValidationDecision.VALIDATED).count()
-        refused_count = validations.filter(decision=ValidationDecision.REFUSED).count()
-        
-        # Amount statistics
-        validated_forms = validations.filter(decision=ValidationDecision.VALIDATED)
-        total_vat_validated = validated_forms.aggregate(
-            total=Sum('form__vat_amount')
-        )['total'] or Decimal('0')
-        total_refund_amount = validated_forms.aggregate(
-            total=Sum('form__refund_amount')
-        )['total'] or Decimal('0')
+        # Counts and amounts in one pass over the validations
+        validated = Q(decision=ValidationDecision.VALIDATED)
+        validation_stats = validations.aggregate(
+            total=Count('id'),
+            validated=Count('id', filter=validated),
+            refused=Count('id', filter=Q(decision=ValidationDecision.REFUSED)),
+            vat=Sum('form__vat_amount', filter=validated),
+            refund=Sum('form__refund_amount', filter=validated),
+            # VALIDATED form status = waiting for refund
+            pending_refund=Count('id', filter=validated & Q(form__status=TaxFreeFormStatus.VALIDATED)),
+        )
+        total_validations = validation_stats['total']
+        validated_count = validation_stats['validated']
+        refused_count = validation_stats['refused']
+        total_vat_validated = validation_stats['vat'] or Decimal('0')
+        total_refund_amount = validation_stats['refund'] or Decimal('0')
+        pending_refund_count = validation_stats['pending_refund']
         
         # Refund statistics
         refunds = self._get_refunds_queryset(date_from, date_to)
         refunds_paid = refunds.filter(status=RefundStatus.PAID)
-        total_refunded = refunds_paid.aggregate(total=Sum('net_amount'))['total'] or Decimal('0')
-        
-        # Service gain statistics
-        total_service_gain_cdf = refunds_paid.aggregate(total=Sum('service_gain_cdf'))['total'] or Decimal('0')
-        
-        # Count validated forms pending refund (VALIDATED status = waiting for refund)
-        pending_refund_count = validated_forms.filter(form__status=TaxFreeFormStatus.VALIDATED).count()
+        refund_stats = refunds_paid.aggregate(
+            paid=Count('id'),
+            refunded=Sum('net_amount'),
+            service_gain_cdf=Sum('service_gain_cdf'),
+        )
+        paid_count = refund_stats['paid']
+        total_refunded = refund_stats['refunded'] or Decimal('0')
+        total_service_gain_cdf = refund_stats['service_gain_cdf'] or Decimal('0')
         
-        # Average processing time (validation to refund)
+        # Average processing time (validation to refund), in seconds
         avg_processing_time = None
-        paid_refunds_with_time = refunds_paid.filter(
+        avg_duration = refunds_paid.filter(
             paid_at__isnull=False,
             form__customs_validation__decided_at__isnull=False
-        ).annotate(
-            processing_time=F('paid_at') - F('form__customs_validation__decided_at')
-        )
-        if paid_refunds_with_time.exists():
-            # Calculate average in seconds
-            total_seconds = sum(
-                r.processing_time.total_seconds() 
-                for r in paid_refunds_with_time 
-                if r.processing_time
-            )
-            avg_processing_time = total_seconds / paid_refunds_with_time.count() if paid_refunds_with_time.count() > 0 else 0
+        ).aggregate(
+            avg=Avg(F('paid_at') - F('form__customs_validation__decided_at'))
+        )['avg']
+        if avg_duration is not None:
+            avg_processing_time = avg_duration.total_seconds()
         
         return {
             'period': {
@@ -121,8 +134,8 @@ class CustomsReportsService:
                 'currency': 'CDF',
             },
             'refunds': {
-                'total': refunds_paid.count() + pending_refund_count,
-                'paid': refunds_paid.count(),
+                'total': paid_count + pending_refund_count,
+                'paid': paid_count,
                 'pending': pending_refund_count,
             },
             'service_gain': {
@@ -188,20 +201,27 @@ class CustomsReportsService:
         validations = self._get_validations_queryset(date_from, date_to)
         refunds = self._get_refunds_queryset(date_from, date_to)
         
-        total = validations.count()
-        validated = validations.filter(decision=ValidationDecision.VALIDATED).count()
-        refused = validations.filter(decision=ValidationDecision.REFUSED).count()
-        total_amount = validations.filter(decision=ValidationDecision.VALIDATED).aggregate(
-            total=Sum('form__refund_amount')
-        )['total'] or Decimal('0')
-        
-        refunds_processed = refunds.filter(
-            Q(initiated_by_id=self.agent_id) | Q(cash_collected_by_id=self.agent_id)
-        ).count()
-        refunds_paid = refunds.filter(status=RefundStatus.PAID).count()
-        total_refunded = refunds.filter(status=RefundStatus.PAID).aggregate(
-            total=Sum('net_amount')
-        )['total'] or Decimal('0')
+        validated_filter = Q(decision=ValidationDecision.VALIDATED)
+        validation_stats = validations.aggregate(
+            total=Count('id'),
+            validated=Count('id', filter=validated_filter),
+            refused=Count('id', filter=Q(decision=ValidationDecision.REFUSED)),
+            amount=Sum('form__refund_amount', filter=validated_filter),
+        )
+        total = validation_stats['total']
+        validated = validation_stats['validated']
+        refused = validation_stats['refused']
+        total_amount = validation_stats['amount'] or Decimal('0')
+        
+        paid_filter = Q(status=RefundStatus.PAID)
+        refund_stats = refunds.aggregate(
+            processed=Count('id', filter=Q(initiated_by_id=self.agent_id) | Q(cash_collected_by_id=self.agent_id)),
+            paid=Count('id', filter=paid_filter),
+            refunded=Sum('net_amount', filter=paid_filter),
+        )
+        refunds_processed = refund_stats['processed']
+        refunds_paid = refund_stats['paid']
+        total_refunded = refund_stats['refunded'] or Decimal('0')
         
         return {
             'agent_id': str(self.agent_id),
@@ -226,22 +246,44 @@ class CustomsReportsService:
         limit: int = 1000
     ) -> List[Dict[str, Any]]:
         """Get detailed list of validations."""
+        return list(self.get_validations_iter(date_from, date_to, decision, limit))
+    
+    def get_validations_iter(
+        self,
+        date_from: datetime = None,
+        date_to: datetime = None,
+        decision: str = None,
+        limit: int = 1000
+    ) -> Iterator[Dict[str, Any]]:
+        """Yield the get_validations_list dicts, fetching rows in chunks."""
         validations = self._get_validations_queryset(date_from, date_to)
         
         if decision:
             validations = validations.filter(decision=decision)
         
         validations = validations.select_related(
-            'form', 'form__traveler', 'form__invoice', 'form__invoice__merchant',
-            'agent', 'point_of_exit'
+            'form', 'form__traveler', 'form__invoice__merchant', 'agent'
+        ).annotate(
+            # Amounts are only serialized as floats, let the database convert them
+            eligible_f=Cast('form__eligible_amount', FloatField()),
+            vat_f=Cast('form__vat_amount', FloatField()),
+            refund_f=Cast('form__refund_amount', FloatField()),
+        ).only(
+            'id', 'decision', 'decided_at', 'refusal_reason', 'physical_control_done', 'is_offline',
+            'form__form_number', 'form__currency',
+            'form__traveler__first_name', 'form__traveler__last_name',
+            'form__traveler__passport_number_last4', 'form__traveler__nationality',
+            'form__invoice__merchant__name',
+            'agent__first_name', 'agent__last_name', 'agent__email', 'agent__agent_code',
         )[:limit]
         
-        return [
-            {
+        decision_labels = self._choice_labels(ValidationDecision.choices)
+        for v in validations.iterator(chunk_size=2000):
+            yield {
                 'id': str(v.id),
                 'form_number': v.form.form_number,
                 'decision': v.decision,
-                'decision_display': v.get_decision_display(),
+                'decision_display': decision_labels.get(v.decision, v.decision),
                 'decided_at': v.decided_at.isoformat() if v.decided_at else None,
                 'agent_name': v.agent.full_name,
                 'agent_code': v.agent.agent_code,
@@ -254,17 +296,48 @@ class CustomsReportsService:
                     'name': v.form.invoice.merchant.name if v.form.invoice and v.form.invoice.merchant else None,
                 },
                 'amounts': {
-                    'eligible': float(v.form.eligible_amount),
-                    'vat': float(v.form.vat_amount),
-                    'refund': float(v.form.refund_amount),
+                    'eligible': v.eligible_f,
+                    'vat': v.vat_f,
+                    'refund': v.refund_f,
                     'currency': v.form.currency,
                 },
                 'refusal_reason': v.refusal_reason if v.decision == ValidationDecision.REFUSED else None,
                 'physical_control_done': v.physical_control_done,
                 'is_offline': v.is_offline,
             }
-            for v in validations
-        ]
+    
+    def get_validations_values(
+        self,
+        date_from: datetime = None,
+        date_to: datetime = None,
+        decision: str = None,
+        limit: int = 1000
+    ):
+        """
+        Get validations as plain dicts holding only the exported columns.
+        
+        Lighter than get_validations_list for exports: no model instances
+        are built and only the needed columns are selected. Names are
+        returned as first/last name parts since full_name is a property,
+        amounts are cast to floats by the database.
+        """
+        validations = self._get_validations_queryset(date_from, date_to)
+        
+        if decision:
+            validations = validations.filter(decision=decision)
+        
+        return validations.annotate(
+            eligible_amount=Cast('form__eligible_amount', FloatField()),
+            vat_amount=Cast('form__vat_amount', FloatField()),
+            refund_amount=Cast('form__refund_amount', FloatField()),
+        ).values(
+            'decision', 'decided_at', 'refusal_reason',
+            'agent__first_name', 'agent__last_name', 'agent__email', 'agent__agent_code',
+            'form__form_number', 'eligible_amount', 'vat_amount', 'refund_amount',
+            'form__traveler__first_name', 'form__traveler__last_name',
+            'form__traveler__passport_number_last4', 'form__traveler__nationality',
+            'form__invoice__merchant__name',
+        )[:limit]
     
     def get_refunds_list(
         self,
@@ -274,87 +347,20 @@ class CustomsReportsService:
         limit: int = 1000
     ) -> List[Dict[str, Any]]:
         """Get detailed list of refunds including failed/cancelled with reasons."""
-        refunds = self._get_refunds_queryset(date_from, date_to)
-        
-        if status:
-            refunds = refunds.filter(status=status)
-        
-        refunds = refunds.select_related(
-            'form', 'form__traveler', 'form__invoice__merchant',
-            'form__customs_validation',
-            'initiated_by', 'cash_collected_by', 'cancelled_by'
-        ).prefetch_related('attempts')[:limit]
-        
-        result = []
-        for r in refunds:
-            # Get last payment attempt error if failed
-            last_error = None
-            if r.status == 'FAILED':
-                last_attempt = r.attempts.order_by('-started_at').first()
-                if last_attempt:
-                    last_error = {
-                        'code': last_attempt.error_code,
-                        'message': last_attempt.error_message,
-                        'provider': last_attempt.provider,
-                        'date': last_attempt.completed_at.isoformat() if last_attempt.completed_at else None,
-                    }
-            
-            # Get validation refusal info if form was refused
-            validation_refusal = None
-            if hasattr(r.form, 'customs_validation') and r.form.customs_validation:
-                cv = r.form.customs_validation
-                if cv.decision == 'REFUSED':
-                    validation_refusal = {
-                        'reason': cv.refusal_reason,
-                        'details': cv.refusal_details,
-                        'agent': cv.agent.full_name if cv.agent else None,
-                        'date': cv.decided_at.isoformat() if cv.decided_at else None,
-                    }
-            
-            result.append({
-                'id': str(r.id),
-                'form_number': r.form.form_number,
-                'status': r.status,
-                'status_display': r.get_status_display(),
-                'method': r.method,
-                'method_display': r.get_method_display(),
-                'traveler_name': r.form.traveler.full_name if r.form.traveler else None,
-                'merchant_name': r.form.invoice.merchant.name if r.form.invoice and r.form.invoice.merchant else None,
-                'amounts': {
-                    'gross': float(r.gross_amount),
-                    'fee': float(r.operator_fee),
-                    'net': float(r.net_amount),
-                    'currency': r.currency,
-                },
-                # Currency conversion info
-                'payout': {
-                    'currency': r.payout_currency or 'CDF',
-                    'exchange_rate': float(r.exchange_rate_applied) if r.exchange_rate_applied else 1.0,
-                    'amount': float(r.payout_amount) if r.payout_amount else float(r.net_amount),
-                    'actual_amount': float(r.actual_payout_amount) if r.actual_payout_amount else None,
-                },
-                # Service gain info
-                'service_gain': {
-                    'amount': float(r.service_gain) if r.service_gain else 0.0,
-                    'currency': r.payout_currency or 'CDF',
-                    'amount_cdf': float(r.service_gain_cdf) if r.service_gain_cdf else 0.0,
-                },
-                'initiated_at': r.initiated_at.isoformat() if r.initiated_at else None,
-                'initiated_by': r.initiated_by.full_name if r.initiated_by else None,
-                'paid_at': r.paid_at.isoformat() if r.paid_at else None,
-                'cash_collected_by': r.cash_collected_by.full_name if r.cash_collected_by else None,
-                # Cancellation info
-                'cancelled_at': r.cancelled_at.isoformat() if r.cancelled_at else None,
-                'cancelled_by': r.cancelled_by.full_name if r.cancelled_by else None,
-                'cancellation_reason': r.cancellation_reason or None,
-                # Failure info
-                'retry_count': r.retry_count,
-                'last_error': last_error,
-                # Validation refusal info (if form was refused at customs)
-                'validation_refusal': validation_refusal,
-            })
-        
-        return result
+        return list(self.get_refunds_iter(date_from, date_to, status, limit))
+    
+    def get_refunds_iter(
+        self,
+        date_from: datetime = None,
+        date_to: datetime = None,
+        status: str = None,
+        limit: int = 1000
+    ) -> Iterator[Dict[str, Any]]:
+        """Yield the get_refunds_list dicts, fetching rows in chunks."""
+        refunds = self._get_refunds_detail_queryset(date_from, date_to, status)[:limit]
+        labels = self._refund_labels()
+        for r in refunds.iterator(chunk_size=2000):
+            yield self._serialize_refund(r, *labels)
     
     # ==================== EXCEL EXPORT ====================
     
@@ -362,45 +368,54 @@ class CustomsReportsService:
         self,
         date_from: datetime = None,
         date_to: datetime = None,
-        decision: str = None
-    ) -> io.BytesIO:
+        decision: str = None,
+        output: BinaryIO = None
+    ) -> BinaryIO:
         """
         Generate Excel export of validations.
         
+        Args:
+            output: Seekable binary file to write the workbook to.
+                Defaults to a new BytesIO.
+        
         Returns:
-            BytesIO object containing the Excel file
+            The output file, rewound to the start
         """
-        validations = self.get_validations_list(date_from, date_to, decision, limit=10000)
-        point_of_exit = PointOfExit.objects.get(id=self.point_of_exit_id)
-        
-        wb = Workbook()
-        ws = wb.active
-        ws.title = "Validations"
-        
-        # Styles
-        header_font = Font(bold=True, color="FFFFFF")
-        header_fill = PatternFill(start_color="2563EB", end_color="2563EB", fill_type="solid")
-        header_alignment = Alignment(horizontal="center", vertical="center", wrap_text=True)
-        thin_border = Border(
-            left=Side(style='thin'),
-            right=Side(style='thin'),
-            top=Side(style='thin'),
-            bottom=Side(style='thin')
-        )
+        validations = self.get_validations_values(date_from, date_to, decision, limit=_EXPORT_ROW_LIMIT)
+        point_of_exit = self.point_of_exit
+        
+        # constant_memory: each row is flushed to a temp file as soon as the
+        # next one starts, so rows must be written top to bottom
+        if output is None:
+            output = io.BytesIO()
+        wb = xlsxwriter.Workbook(output, {'constant_memory': True})
+        ws = wb.add_worksheet("Validations")
+        
+        # Formats
+        header_format = wb.add_format({
+            'bold': True, 'font_color': '#FFFFFF', 'bg_color': '#2563EB',
+            'align': 'center', 'valign': 'vcenter', 'text_wrap': True, 'border': 1,
+        })
+        title_format = wb.add_format({'bold': True, 'font_size': 14, 'align': 'center'})
+        centered = wb.add_format({'align': 'center'})
+        data_format = wb.add_format({'border': 1})
+        decision_formats = {
+            'VALIDATED': wb.add_format({'border': 1, 'bg_color': '#D1FAE5'}),
+            'REFUSED': wb.add_format({'border': 1, 'bg_color': '#FEE2E2'}),
+        }
+        
+        # Adjust column widths
+        column_widths = [18, 18, 12, 20, 12, 25, 12, 10, 25, 15, 15, 15, 20]
+        for i, width in enumerate(column_widths):
+            ws.set_column(i, i, width)
         
         # Title row
-        ws.merge_cells('A1:M1')
-        ws['A1'] = f"Mes Validations - {self.agent_name or 'Agent'}"
-        ws['A1'].font = Font(bold=True, size=14)
-        ws['A1'].alignment = Alignment(horizontal="center")
+        ws.merge_range('A1:M1', f"Mes Validations - {self.agent_name or 'Agent'}", title_format)
         
         # Frontier row
-        ws.merge_cells('A2:M2')
-        ws['A2'] = f"Frontière: {point_of_exit.name} ({point_of_exit.code})"
-        ws['A2'].alignment = Alignment(horizontal="center")
+        ws.merge_range('A2:M2', f"Frontière: {point_of_exit.name} ({point_of_exit.code})", centered)
         
         # Period row
-        ws.merge_cells('A3:M3')
         period_text = "Période: "
         if date_from:
             period_text += f"Du {date_from.strftime('%d/%m/%Y')}"
@@ -408,13 +423,10 @@ class CustomsReportsService:
             period_text += f" au {date_to.strftime('%d/%m/%Y')}"
         if not date_from and not date_to:
             period_text += "Toutes les données"
-        ws['A3'] = period_text
-        ws['A3'].alignment = Alignment(horizontal="center")
+        ws.merge_range('A3:M3', period_text, centered)
         
         # Generated date
-        ws.merge_cells('A4:M4')
-        ws['A4'] = f"Généré le: {timezone.now().strftime('%d/%m/%Y %H:%M')}"
-        ws['A4'].alignment = Alignment(horizontal="center")
+        ws.merge_range('A4:M4', f"Généré le: {timezone.now().strftime('%d/%m/%Y %H:%M')}", centered)
         
         # Headers
         headers = [
@@ -422,56 +434,52 @@ class CustomsReportsService:
             "Voyageur", "Passeport", "Nationalité", "Commerçant",
             "Montant Éligible", "TVA", "Remboursement", "Motif Refus"
         ]
-        
-        for col, header in enumerate(headers, 1):
-            cell = ws.cell(row=6, column=col, value=header)
-            cell.font = header_font
-            cell.fill = header_fill
-            cell.alignment = header_alignment
-            cell.border = thin_border
+        ws.write_row(5, 0, headers, header_format)
         
         # Data rows
-        for row_idx, v in enumerate(validations, 7):
-            ws.cell(row=row_idx, column=1, value=v['form_number']).border = thin_border
-            ws.cell(row=row_idx, column=2, value=v['decided_at'][:19].replace('T', ' ') if v['decided_at'] else '').border = thin_border
-            ws.cell(row=row_idx, column=3, value=v['decision_display']).border = thin_border
-            ws.cell(row=row_idx, column=4, value=v['agent_name']).border = thin_border
-            ws.cell(row=row_idx, column=5, value=v['agent_code'] or '').border = thin_border
-            ws.cell(row=row_idx, column=6, value=v['traveler']['name'] or '').border = thin_border
-            ws.cell(row=row_idx, column=7, value=v['traveler']['passport'] or '').border = thin_border
-            ws.cell(row=row_idx, column=8, value=v['traveler']['nationality'] or '').border = thin_border
-            ws.cell(row=row_idx, column=9, value=v['merchant']['name'] or '').border = thin_border
-            ws.cell(row=row_idx, column=10, value=v['amounts']['eligible']).border = thin_border
-            ws.cell(row=row_idx, column=11, value=v['amounts']['vat']).border = thin_border
-            ws.cell(row=row_idx, column=12, value=v['amounts']['refund']).border = thin_border
-            ws.cell(row=row_idx, column=13, value=v['refusal_reason'] or '').border = thin_border
-            
+        first_data_row = 6
+        row_idx = first_data_row
+        decision_labels = self._choice_labels(ValidationDecision.choices)
+        for v in validations.iterator(chunk_size=2000):
+            agent_name = f"{v['agent__first_name']} {v['agent__last_name']}".strip() or v['agent__email']
+            decision_label = decision_labels.get(v['decision'], v['decision'])
+            ws.write_row(row_idx, 0, (
+                v['form__form_number'],
+                v['decided_at'].isoformat(sep=' ')[:19] if v['decided_at'] else '',
+                decision_label,
+                agent_name,
+                v['agent__agent_code'] or '',
+                f"{v['form__traveler__first_name']} {v['form__traveler__last_name']}",
+                f"***{v['form__traveler__passport_number_last4']}",
+                v['form__traveler__nationality'] or '',
+                v['form__invoice__merchant__name'] or '',
+                v['eligible_amount'],
+                v['vat_amount'],
+                v['refund_amount'],
+                v['refusal_reason'] if v['decision'] == ValidationDecision.REFUSED else '',
+            ), data_format)
             # Color coding for decision
-            if v['decision'] == 'VALIDATED':
-                ws.cell(row=row_idx, column=3).fill = PatternFill(start_color="D1FAE5", end_color="D1FAE5", fill_type="solid")
-            elif v['decision'] == 'REFUSED':
-                ws.cell(row=row_idx, column=3).fill = PatternFill(start_color="FEE2E2", end_color="FEE2E2", fill_type="solid")
-        
-        # Adjust column widths
-        column_widths = [18, 18, 12, 20, 12, 25, 12, 10, 25, 15, 15, 15, 20]
-        for i, width in enumerate(column_widths, 1):
-            ws.column_dimensions[get_column_letter(i)].width = width
+            if v['decision'] in decision_formats:
+                ws.write(row_idx, 2, decision_label, decision_formats[v['decision']])
+            row_idx += 1
+        row_idx = self._write_limit_notice(ws, wb, row_idx, first_data_row, "toutes les validations")
         
         # Summary section
-        summary_row = len(validations) + 8
-        ws.cell(row=summary_row, column=1, value="RÉSUMÉ").font = Font(bold=True)
-        ws.cell(row=summary_row + 1, column=1, value="Total validations:")
-        ws.cell(row=summary_row + 1, column=2, value=len(validations))
-        ws.cell(row=summary_row + 2, column=1, value="Validés:")
-        ws.cell(row=summary_row + 2, column=2, value=sum(1 for v in validations if v['decision'] == 'VALIDATED'))
-        ws.cell(row=summary_row + 3, column=1, value="Refusés:")
-        ws.cell(row=summary_row + 3, column=2, value=sum(1 for v in validations if v['decision'] == 'REFUSED'))
-        ws.cell(row=summary_row + 4, column=1, value="Total TVA validée:")
-        ws.cell(row=summary_row + 4, column=2, value=sum(v['amounts']['vat'] for v in validations if v['decision'] == 'VALIDATED'))
-        
-        # Save to BytesIO
-        output = io.BytesIO()
-        wb.save(output)
+        validations_qs = self._get_validations_queryset(date_from, date_to)
+        if decision:
+            validations_qs = validations_qs.filter(decision=decision)
+        if row_idx == first_data_row:
+            # Nothing exported: an empty queryset aggregates to zeros without a query
+            validations_qs = validations_qs.none()
+        summary = self._summary_for_validations(validations_qs)
+        summary_row = row_idx + 1
+        ws.write(summary_row, 0, "RÉSUMÉ", wb.add_format({'bold': True}))
+        ws.write_row(summary_row + 1, 0, ("Total validations:", summary['total']))
+        ws.write_row(summary_row + 2, 0, ("Validés:", summary['validated']))
+        ws.write_row(summary_row + 3, 0, ("Refusés:", summary['refused']))
+        ws.write_row(summary_row + 4, 0, ("Total TVA validée:", summary['vat_validated']))
+        
+        wb.close()
         output.seek(0)
         return output
     
@@ -479,40 +487,49 @@ class CustomsReportsService:
         self,
         date_from: datetime = None,
         date_to: datetime = None,
-        status: str = None
-    ) -> io.BytesIO:
-        """Generate Excel export of refunds."""
-        refunds = self.get_refunds_list(date_from, date_to, status, limit=10000)
-        point_of_exit = PointOfExit.objects.get(id=self.point_of_exit_id)
-        
-        wb = Workbook()
-        ws = wb.active
-        ws.title = "Remboursements"
-        
-        # Styles
-        header_font = Font(bold=True, color="FFFFFF")
-        header_fill = PatternFill(start_color="059669", end_color="059669", fill_type="solid")
-        header_alignment = Alignment(horizontal="center", vertical="center", wrap_text=True)
-        thin_border = Border(
-            left=Side(style='thin'),
-            right=Side(style='thin'),
-            top=Side(style='thin'),
-            bottom=Side(style='thin')
-        )
+        status: str = None,
+        output: BinaryIO = None
+    ) -> BinaryIO:
+        """Generate Excel export of refunds (see generate_validations_excel for output)."""
+        refunds = self.get_refunds_iter(date_from, date_to, status, limit=_EXPORT_ROW_LIMIT)
+        point_of_exit = self.point_of_exit
+        
+        if output is None:
+            output = io.BytesIO()
+        wb = xlsxwriter.Workbook(output, {'constant_memory': True})
+        ws = wb.add_worksheet("Remboursements")
+        
+        # Formats
+        header_format = wb.add_format({
+            'bold': True, 'font_color': '#FFFFFF', 'bg_color': '#059669',
+            'align': 'center', 'valign': 'vcenter', 'text_wrap': True, 'border': 1,
+        })
+        title_format = wb.add_format({'bold': True, 'font_size': 14, 'align': 'center'})
+        centered = wb.add_format({'align': 'center'})
+        data_format = wb.add_format({'border': 1})
+        paid_format = wb.add_format({'border': 1, 'bg_color': '#D1FAE5'})
+        pending_format = wb.add_format({'border': 1, 'bg_color': '#FEF3C7'})
+        failed_format = wb.add_format({'border': 1, 'bg_color': '#FEE2E2'})
+        status_formats = {
+            'PAID': paid_format,
+            'PENDING': pending_format,
+            'INITIATED': pending_format,
+            'FAILED': failed_format,
+            'CANCELLED': failed_format,
+        }
+        
+        # Adjust column widths
+        column_widths = [18, 12, 15, 25, 25, 15, 12, 15, 10, 12, 15, 15, 12, 15, 12, 12, 20, 12, 30]
+        for i, width in enumerate(column_widths):
+            ws.set_column(i, i, width)
         
         # Title
-        ws.merge_cells('A1:K1')
-        ws['A1'] = f"Mes Remboursements - {self.agent_name or 'Agent'}"
-        ws['A1'].font = Font(bold=True, size=14)
-        ws['A1'].alignment = Alignment(horizontal="center")
+        ws.merge_range('A1:K1', f"Mes Remboursements - {self.agent_name or 'Agent'}", title_format)
         
         # Frontier row
-        ws.merge_cells('A2:K2')
-        ws['A2'] = f"Frontière: {point_of_exit.name} ({point_of_exit.code})"
-        ws['A2'].alignment = Alignment(horizontal="center")
+        ws.merge_range('A2:K2', f"Frontière: {point_of_exit.name} ({point_of_exit.code})", centered)
         
         # Period
-        ws.merge_cells('A3:K3')
         period_text = "Période: "
         if date_from:
             period_text += f"Du {date_from.strftime('%d/%m/%Y')}"
@@ -520,13 +537,10 @@ class CustomsReportsService:
             period_text += f" au {date_to.strftime('%d/%m/%Y')}"
         if not date_from and not date_to:
             period_text += "Toutes les données"
-        ws['A3'] = period_text
-        ws['A3'].alignment = Alignment(horizontal="center")
+        ws.merge_range('A3:K3', period_text, centered)
         
         # Generated date
-        ws.merge_cells('A4:K4')
-        ws['A4'] = f"Généré le: {timezone.now().strftime('%d/%m/%Y %H:%M')}"
-        ws['A4'].alignment = Alignment(horizontal="center")
+        ws.merge_range('A4:K4', f"Généré le: {timezone.now().strftime('%d/%m/%Y %H:%M')}", centered)
         
         # Headers - including currency conversion, service gain and cancellation/failure columns
         headers = [
@@ -535,36 +549,15 @@ class CustomsReportsService:
             "Devise Paiement", "Taux Change", "Montant Prévu", "Montant Donné", "Gain Service", "Gain Service (CDF)",
             "Initié le", "Payé le", "Agent", "Annulé le", "Motif Annulation/Échec"
         ]
-        
-        for col, header in enumerate(headers, 1):
-            cell = ws.cell(row=6, column=col, value=header)
-            cell.font = header_font
-            cell.fill = header_fill
-            cell.alignment = header_alignment
-            cell.border = thin_border
+        ws.write_row(5, 0, headers, header_format)
         
         # Data rows
-        for row_idx, r in enumerate(refunds, 7):
-            ws.cell(row=row_idx, column=1, value=r['form_number']).border = thin_border
-            ws.cell(row=row_idx, column=2, value=r['status_display']).border = thin_border
-            ws.cell(row=row_idx, column=3, value=r['method_display']).border = thin_border
-            ws.cell(row=row_idx, column=4, value=r['traveler_name'] or '').border = thin_border
-            ws.cell(row=row_idx, column=5, value=r['merchant_name'] or '').border = thin_border
-            ws.cell(row=row_idx, column=6, value=r['amounts']['gross']).border = thin_border
-            ws.cell(row=row_idx, column=7, value=r['amounts']['fee']).border = thin_border
-            ws.cell(row=row_idx, column=8, value=r['amounts']['net']).border = thin_border
-            # Currency conversion columns
+        # Rows are fetched and serialized in chunks rather than all up front
+        first_data_row = 6
+        row_idx = first_data_row
+        for r in refunds:
             payout = r.get('payout', {})
             service_gain = r.get('service_gain', {})
-            ws.cell(row=row_idx, column=9, value=payout.get('currency', 'CDF')).border = thin_border
-            ws.cell(row=row_idx, column=10, value=payout.get('exchange_rate', 1.0)).border = thin_border
-            ws.cell(row=row_idx, column=11, value=payout.get('amount', r['amounts']['net'])).border = thin_border
-            ws.cell(row=row_idx, column=12, value=payout.get('actual_amount') or payout.get('amount', r['amounts']['net'])).border = thin_border
-            ws.cell(row=row_idx, column=13, value=service_gain.get('amount', 0)).border = thin_border
-            ws.cell(row=row_idx, column=14, value=service_gain.get('amount_cdf', 0)).border = thin_border
-            ws.cell(row=row_idx, column=15, value=r['initiated_at'][:10] if r['initiated_at'] else '').border = thin_border
-            ws.cell(row=row_idx, column=16, value=r['paid_at'][:10] if r['paid_at'] else '').border = thin_border
-            ws.cell(row=row_idx, column=17, value=r['initiated_by'] or r['cash_collected_by'] or '').border = thin_border
             
             # Cancellation/Failure date
             cancel_date = ''
@@ -572,7 +565,6 @@ class CustomsReportsService:
                 cancel_date = r['cancelled_at'][:10]
             elif r.get('last_error') and r['last_error'].get('date'):
                 cancel_date = r['last_error']['date'][:10]
-            ws.cell(row=row_idx, column=18, value=cancel_date).border = thin_border
             
             # Cancellation/Failure reason
             reason = ''
@@ -581,72 +573,88 @@ class CustomsReportsService:
             elif r.get('last_error'):
                 error = r['last_error']
                 reason = f"{error.get('message', '')} ({error.get('code', '')})"
-            ws.cell(row=row_idx, column=19, value=reason).border = thin_border
             
+            ws.write_row(row_idx, 0, (
+                r['form_number'],
+                r['status_display'],
+                r['method_display'],
+                r['traveler_name'] or '',
+                r['merchant_name'] or '',
+                r['amounts']['gross'],
+                r['amounts']['fee'],
+                r['amounts']['net'],
+                # Currency conversion columns
+                payout.get('currency', 'CDF'),
+                payout.get('exchange_rate', 1.0),
+                payout.get('amount', r['amounts']['net']),
+                payout.get('actual_amount') or payout.get('amount', r['amounts']['net']),
+                service_gain.get('amount', 0),
+                service_gain.get('amount_cdf', 0),
+                r['initiated_at'][:10] if r['initiated_at'] else '',
+                r['paid_at'][:10] if r['paid_at'] else '',
+                r['initiated_by'] or r['cash_collected_by'] or '',
+                cancel_date,
+                reason,
+            ), data_format)
             # Color coding for status
-            if r['status'] == 'PAID':
-                ws.cell(row=row_idx, column=2).fill = PatternFill(start_color="D1FAE5", end_color="D1FAE5", fill_type="solid")
-            elif r['status'] in ['PENDING', 'INITIATED']:
-                ws.cell(row=row_idx, column=2).fill = PatternFill(start_color="FEF3C7", end_color="FEF3C7", fill_type="solid")
-            elif r['status'] in ['FAILED', 'CANCELLED']:
-                ws.cell(row=row_idx, column=2).fill = PatternFill(start_color="FEE2E2", end_color="FEE2E2", fill_type="solid")
-        
-        # Adjust column widths
-        column_widths = [18, 12, 15, 25, 25, 15, 12, 15, 10, 12, 15, 15, 12, 15, 12, 12, 20, 12, 30]
-        for i, width in enumerate(column_widths, 1):
-            ws.column_dimensions[get_column_letter(i)].width = width
+            if r['status'] in status_formats:
+                ws.write(row_idx, 1, r['status_display'], status_formats[r['status']])
+            row_idx += 1
+        row_idx = self._write_limit_notice(ws, wb, row_idx, first_data_row, "tous les remboursements")
         
         # Summary
-        summary_row = len(refunds) + 9
-        ws.cell(row=summary_row, column=1, value="RÉSUMÉ").font = Font(bold=True)
-        ws.cell(row=summary_row + 1, column=1, value="Total remboursements:")
-        ws.cell(row=summary_row + 1, column=2, value=len(refunds))
-        ws.cell(row=summary_row + 2, column=1, value="Payés:")
-        ws.cell(row=summary_row + 2, column=2, value=sum(1 for r in refunds if r['status'] == 'PAID'))
-        ws.cell(row=summary_row + 3, column=1, value="En attente:")
-        ws.cell(row=summary_row + 3, column=2, value=sum(1 for r in refunds if r['status'] in ['PENDING', 'INITIATED']))
-        ws.cell(row=summary_row + 4, column=1, value="Échoués:")
-        ws.cell(row=summary_row + 4, column=2, value=sum(1 for r in refunds if r['status'] == 'FAILED'))
-        ws.cell(row=summary_row + 5, column=1, value="Annulés:")
-        ws.cell(row=summary_row + 5, column=2, value=sum(1 for r in refunds if r['status'] == 'CANCELLED'))
-        ws.cell(row=summary_row + 6, column=1, value="Total remboursé (CDF):")
-        ws.cell(row=summary_row + 6, column=2, value=sum(r['amounts']['net'] for r in refunds if r['status'] == 'PAID'))
-        ws.cell(row=summary_row + 7, column=1, value="Total gain de service (CDF):").font = Font(bold=True, color="0000FF")
-        ws.cell(row=summary_row + 7, column=2, value=sum(r.get('service_gain', {}).get('amount_cdf', 0) for r in refunds if r['status'] == 'PAID')).font = Font(bold=True, color="0000FF")
-        
-        output = io.BytesIO()
-        wb.save(output)
+        refunds_qs = self._get_refunds_queryset(date_from, date_to)
+        if status:
+            refunds_qs = refunds_qs.filter(status=status)
+        if row_idx == first_data_row:
+            # Nothing exported: an empty queryset aggregates to zeros without a query
+            refunds_qs = refunds_qs.none()
+        summary = self._summary_for_refunds(refunds_qs)
+        summary_row = row_idx + 2
+        total_format = wb.add_format({'bold': True, 'font_color': '#0000FF'})
+        ws.write(summary_row, 0, "RÉSUMÉ", wb.add_format({'bold': True}))
+        ws.write_row(summary_row + 1, 0, ("Total remboursements:", summary['total']))
+        ws.write_row(summary_row + 2, 0, ("Payés:", summary['paid']))
+        ws.write_row(summary_row + 3, 0, ("En attente:", summary['pending']))
+        ws.write_row(summary_row + 4, 0, ("Échoués:", summary['failed']))
+        ws.write_row(summary_row + 5, 0, ("Annulés:", summary['cancelled']))
+        ws.write_row(summary_row + 6, 0, ("Total remboursé (CDF):", summary['net_paid']))
+        ws.write_row(summary_row + 7, 0, ("Total gain de service (CDF):", summary['service_gain_cdf']), total_format)
+        
+        wb.close()
         output.seek(0)
         return output
     
     def generate_summary_excel(
         self,
         date_from: datetime = None,
-        date_to: datetime = None
-    ) -> io.BytesIO:
-        """Generate comprehensive summary Excel report for the agent."""
-        point_of_exit = PointOfExit.objects.get(id=self.point_of_exit_id)
+        date_to: datetime = None,
+        output: BinaryIO = None
+    ) -> BinaryIO:
+        """Generate comprehensive summary Excel report for the agent (see generate_validations_excel for output)."""
+        point_of_exit = self.point_of_exit
         stats = self.get_dashboard_stats(date_from, date_to)
         daily_stats = self.get_daily_stats(date_from, date_to)
-        agent_summary = self.get_agent_summary(date_from, date_to)
         
-        wb = Workbook()
+        # Both sheets are written top to bottom, see generate_validations_excel
+        if output is None:
+            output = io.BytesIO()
+        wb = xlsxwriter.Workbook(output, {'constant_memory': True})
         
-        # ===== Sheet 1: Summary =====
-        ws1 = wb.active
-        ws1.title = "Résumé"
+        # Formats
+        header_format = wb.add_format(_SUMMARY_HEADER_FORMAT)
+        title_format = wb.add_format(_SUMMARY_TITLE_FORMAT)
+        section_format = wb.add_format(_SUMMARY_SECTION_FORMAT)
+        plain = wb.add_format()
         
-        header_font = Font(bold=True, color="FFFFFF")
-        header_fill = PatternFill(start_color="1E40AF", end_color="1E40AF", fill_type="solid")
-        
-        ws1.merge_cells('A1:D1')
-        ws1['A1'] = f"Rapport Personnel - {self.agent_name or 'Agent'}"
-        ws1['A1'].font = Font(bold=True, size=16)
+        # ===== Sheet 1: Summary =====
+        ws1 = wb.add_worksheet("Résumé")
+        for i, width in enumerate(_SUMMARY_COLUMN_WIDTHS):
+            ws1.set_column(i, i, width)
         
-        ws1.merge_cells('A2:D2')
-        ws1['A2'] = f"Frontière: {point_of_exit.name} ({point_of_exit.code})"
+        ws1.merge_range('A1:D1', f"Rapport Personnel - {self.agent_name or 'Agent'}", title_format)
+        ws1.merge_range('A2:D2', f"Frontière: {point_of_exit.name} ({point_of_exit.code})", plain)
         
-        ws1.merge_cells('A3:D3')
         period_text = "Période: "
         if date_from:
             period_text += f"Du {date_from.strftime('%d/%m/%Y')}"
@@ -654,71 +662,219 @@ class CustomsReportsService:
             period_text += f" au {date_to.strftime('%d/%m/%Y')}"
         if not date_from and not date_to:
             period_text += "Toutes les données"
-        ws1['A3'] = period_text
-        
-        ws1['A5'] = "MES STATISTIQUES DE VALIDATION"
-        ws1['A5'].font = Font(bold=True, size=12)
-        
-        ws1['A7'] = "Total validations effectuées"
-        ws1['B7'] = stats['validations']['total']
-        ws1['A8'] = "Bordereaux validés"
-        ws1['B8'] = stats['validations']['validated']
-        ws1['A9'] = "Bordereaux refusés"
-        ws1['B9'] = stats['validations']['refused']
-        ws1['A10'] = "Mon taux de validation"
-        ws1['B10'] = f"{stats['validations']['validation_rate']}%"
-        
-        ws1['A12'] = "MES MONTANTS TRAITÉS"
-        ws1['A12'].font = Font(bold=True, size=12)
-        
-        ws1['A14'] = "TVA totale validée"
-        ws1['B14'] = f"{stats['amounts']['total_vat_validated']:,.0f} CDF"
-        ws1['A15'] = "Montant à rembourser"
-        ws1['B15'] = f"{stats['amounts']['total_refund_amount']:,.0f} CDF"
-        ws1['A16'] = "Montant remboursé"
-        ws1['B16'] = f"{stats['amounts']['total_refunded']:,.0f} CDF"
-        
-        ws1['A18'] = "MES REMBOURSEMENTS"
-        ws1['A18'].font = Font(bold=True, size=12)
-        
-        ws1['A20'] = "Total remboursements traités"
-        ws1['B20'] = stats['refunds']['total']
-        ws1['A21'] = "Payés"
-        ws1['B21'] = stats['refunds']['paid']
-        ws1['A22'] = "En attente"
-        ws1['B22'] = stats['refunds']['pending']
-        
-        ws1.column_dimensions['A'].width = 30
-        ws1.column_dimensions['B'].width = 20
+        ws1.merge_range('A3:D3', period_text, plain)
+        
+        ws1.write('A5', "MES STATISTIQUES DE VALIDATION", section_format)
+        ws1.write_row('A7', ("Total validations effectuées", stats['validations']['total']))
+        ws1.write_row('A8', ("Bordereaux validés", stats['validations']['validated']))
+        ws1.write_row('A9', ("Bordereaux refusés", stats['validations']['refused']))
+        ws1.write_row('A10', ("Mon taux de validation", f"{stats['validations']['validation_rate']}%"))
+        
+        ws1.write('A12', "MES MONTANTS TRAITÉS", section_format)
+        ws1.write_row('A14', ("TVA totale validée", f"{stats['amounts']['total_vat_validated']:,.0f} CDF"))
+        ws1.write_row('A15', ("Montant à rembourser", f"{stats['amounts']['total_refund_amount']:,.0f} CDF"))
+        ws1.write_row('A16', ("Montant remboursé", f"{stats['amounts']['total_refunded']:,.0f} CDF"))
+        
+        ws1.write('A18', "MES REMBOURSEMENTS", section_format)
+        ws1.write_row('A20', ("Total remboursements traités", stats['refunds']['total']))
+        ws1.write_row('A21', ("Payés", stats['refunds']['paid']))
+        ws1.write_row('A22', ("En attente", stats['refunds']['pending']))
         
         # ===== Sheet 2: Daily Stats =====
-        ws2 = wb.create_sheet("Statistiques Journalières")
-        
-        headers = ["Date", "Total", "Validés", "Refusés", "Remboursés", "Montant Validé (CDF)", "Montant Remboursé (CDF)"]
-        for col, header in enumerate(headers, 1):
-            cell = ws2.cell(row=1, column=col, value=header)
-            cell.font = header_font
-            cell.fill = header_fill
-        
-        for row_idx, day in enumerate(daily_stats, 2):
-            ws2.cell(row=row_idx, column=1, value=day['date'])
-            ws2.cell(row=row_idx, column=2, value=day['total'])
-            ws2.cell(row=row_idx, column=3, value=day['validated'])
-            ws2.cell(row=row_idx, column=4, value=day['refused'])
-            ws2.cell(row=row_idx, column=5, value=day.get('refunded', 0))
-            ws2.cell(row=row_idx, column=6, value=day['total_amount'])
-            ws2.cell(row=row_idx, column=7, value=day.get('refunded_amount', 0))
-        
-        for i, width in enumerate([12, 10, 10, 10, 12, 18, 20], 1):
-            ws2.column_dimensions[get_column_letter(i)].width = width
-        
-        output = io.BytesIO()
-        wb.save(output)
+        ws2 = wb.add_worksheet("Statistiques Journalières")
+        for i, width in enumerate(_DAILY_COLUMN_WIDTHS):
+            ws2.set_column(i, i, width)
+        ws2.write_row(0, 0, _DAILY_HEADERS, header_format)
+        
+        for row_idx, day in enumerate(daily_stats, 1):
+            ws2.write_row(row_idx, 0, (
+                day['date'],
+                day['total'],
+                day['validated'],
+                day['refused'],
+                day.get('refunded', 0),
+                day['total_amount'],
+                day.get('refunded_amount', 0),
+            ))
+        
+        wb.close()
         output.seek(0)
         return output
     
     # ==================== PRIVATE HELPER METHODS ====================
     
+    @staticmethod
+    def _write_limit_notice(ws, wb, row_idx, first_data_row, covered):
+        """
+        Flag an export cut off at _EXPORT_ROW_LIMIT rows.
+        
+        The summary below it still covers the whole period. Returns the next
+        free row.
+        """
+        if row_idx - first_data_row < _EXPORT_ROW_LIMIT:
+            return row_idx
+        ws.write(
+            row_idx, 0,
+            f"Export limité aux {_EXPORT_ROW_LIMIT} premières lignes, le résumé couvre {covered} de la période",
+            wb.add_format({'bold': True, 'font_color': '#DC2626'}),
+        )
+        return row_idx + 1
+    
+    @staticmethod
+    def _summary_for_validations(queryset) -> Dict[str, Any]:
+        """Export summary figures for a validations queryset, in one query."""
+        validated = Q(decision=ValidationDecision.VALIDATED)
+        summary = queryset.aggregate(
+            total=Count('id'),
+            validated=Count('id', filter=validated),
+            refused=Count('id', filter=Q(decision=ValidationDecision.REFUSED)),
+            vat_validated=Sum('form__vat_amount', filter=validated),
+        )
+        summary['vat_validated'] = float(summary['vat_validated'] or 0)
+        return summary
+    
+    @staticmethod
+    def _summary_for_refunds(queryset) -> Dict[str, Any]:
+        """Export summary figures for a refunds queryset, in one query."""
+        paid = Q(status=RefundStatus.PAID)
+        summary = queryset.aggregate(
+            total=Count('id'),
+            paid=Count('id', filter=paid),
+            pending=Count('id', filter=Q(status__in=[RefundStatus.PENDING, RefundStatus.INITIATED])),
+            failed=Count('id', filter=Q(status=RefundStatus.FAILED)),
+            cancelled=Count('id', filter=Q(status=RefundStatus.CANCELLED)),
+            net_paid=Sum('net_amount', filter=paid),
+            service_gain_cdf=Sum('service_gain_cdf', filter=paid),
+        )
+        summary['net_paid'] = float(summary['net_paid'] or 0)
+        summary['service_gain_cdf'] = float(summary['service_gain_cdf'] or 0)
+        return summary
+    
+    def _get_refunds_detail_queryset(self, date_from: datetime = None, date_to: datetime = None, status: str = None):
+        """Refunds queryset with the relations read by _serialize_refund."""
+        refunds = self._get_refunds_queryset(date_from, date_to)
+        
+        if status:
+            refunds = refunds.filter(status=status)
+        
+        refunds = refunds.select_related(
+            'form', 'form__traveler', 'form__invoice__merchant',
+            'form__customs_validation', 'form__customs_validation__agent',
+            'initiated_by', 'cash_collected_by', 'cancelled_by'
+        ).only(
+            'id', 'status', 'method', 'currency', 'gross_amount', 'operator_fee', 'net_amount',
+            'payout_currency', 'exchange_rate_applied', 'payout_amount', 'actual_payout_amount',
+            'service_gain', 'service_gain_cdf', 'initiated_at', 'paid_at',
+            'cancelled_at', 'cancellation_reason', 'retry_count',
+            'form__form_number',
+            'form__traveler__first_name', 'form__traveler__last_name',
+            'form__invoice__merchant__name',
+            'form__customs_validation__decision', 'form__customs_validation__refusal_reason',
+            'form__customs_validation__refusal_details', 'form__customs_validation__decided_at',
+            'form__customs_validation__agent__first_name', 'form__customs_validation__agent__last_name',
+            'form__customs_validation__agent__email',
+            'initiated_by__first_name', 'initiated_by__last_name', 'initiated_by__email',
+            'cash_collected_by__first_name', 'cash_collected_by__last_name', 'cash_collected_by__email',
+            'cancelled_by__first_name', 'cancelled_by__last_name', 'cancelled_by__email',
+        )
+        
+        # Only failed refunds report an error, and only their latest attempt
+        if not status or status == RefundStatus.FAILED:
+            last_attempts = PaymentAttempt.objects.filter(
+                refund__status=RefundStatus.FAILED
+            ).only(
+                'refund', 'provider', 'error_code', 'error_message', 'started_at', 'completed_at'
+            ).order_by('-started_at')[:1]
+            refunds = refunds.prefetch_related(
+                Prefetch('attempts', queryset=last_attempts, to_attr='last_attempts')
+            )
+        
+        return refunds
+    
+    @staticmethod
+    def _choice_labels(choices) -> Dict[str, str]:
+        """
+        Translated labels by value, resolved once per report.
+        
+        Model get_FOO_display() rebuilds and hashes the lazy choices on every
+        call, which dominates the per-row cost of large lists and exports.
+        """
+        return {value: str(label) for value, label in choices}
+    
+    @classmethod
+    def _refund_labels(cls) -> tuple:
+        """Status and method labels for _serialize_refund."""
+        return cls._choice_labels(RefundStatus.choices), cls._choice_labels(RefundMethod.choices)
+    
+    @staticmethod
+    def _serialize_refund(r, status_labels: Dict[str, str], method_labels: Dict[str, str]) -> Dict[str, Any]:
+        """Detailed dict for one refund of _get_refunds_detail_queryset."""
+        # Get last payment attempt error if failed
+        last_error = None
+        if r.status == 'FAILED':
+            last_attempt = r.last_attempts[0] if r.last_attempts else None
+            if last_attempt:
+                last_error = {
+                    'code': last_attempt.error_code,
+                    'message': last_attempt.error_message,
+                    'provider': last_attempt.provider,
+                    'date': last_attempt.completed_at.isoformat() if last_attempt.completed_at else None,
+                }
+        
+        # Get validation refusal info if form was refused
+        validation_refusal = None
+        cv = getattr(r.form, 'customs_validation', None)
+        if cv is not None and cv.decision == 'REFUSED':
+            validation_refusal = {
+                'reason': cv.refusal_reason,
+                'details': cv.refusal_details,
+                'agent': cv.agent.full_name if cv.agent else None,
+                'date': cv.decided_at.isoformat() if cv.decided_at else None,
+            }
+        
+        return {
+            'id': str(r.id),
+            'form_number': r.form.form_number,
+            'status': r.status,
+            'status_display': status_labels.get(r.status, r.status),
+            'method': r.method,
+            'method_display': method_labels.get(r.method, r.method),
+            'traveler_name': r.form.traveler.full_name if r.form.traveler else None,
+            'merchant_name': r.form.invoice.merchant.name if r.form.invoice and r.form.invoice.merchant else None,
+            'amounts': {
+                'gross': float(r.gross_amount),
+                'fee': float(r.operator_fee),
+                'net': float(r.net_amount),
+                'currency': r.currency,
+            },
+            # Currency conversion info
+            'payout': {
+                'currency': r.payout_currency or 'CDF',
+                'exchange_rate': float(r.exchange_rate_applied) if r.exchange_rate_applied else 1.0,
+                'amount': float(r.payout_amount) if r.payout_amount else float(r.net_amount),
+                'actual_amount': float(r.actual_payout_amount) if r.actual_payout_amount else None,
+            },
+            # Service gain info
+            'service_gain': {
+                'amount': float(r.service_gain) if r.service_gain else 0.0,
+                'currency': r.payout_currency or 'CDF',
+                'amount_cdf': float(r.service_gain_cdf) if r.service_gain_cdf else 0.0,
+            },
+            'initiated_at': r.initiated_at.isoformat() if r.initiated_at else None,
+            'initiated_by': r.initiated_by.full_name if r.initiated_by else None,
+            'paid_at': r.paid_at.isoformat() if r.paid_at else None,
+            'cash_collected_by': r.cash_collected_by.full_name if r.cash_collected_by else None,
+            # Cancellation info
+            'cancelled_at': r.cancelled_at.isoformat() if r.cancelled_at else None,
+            'cancelled_by': r.cancelled_by.full_name if r.cancelled_by else None,
+            'cancellation_reason': r.cancellation_reason or None,
+            # Failure info
+            'retry_count': r.retry_count,
+            'last_error': last_error,
+            # Validation refusal info (if form was refused at customs)
+            'validation_refusal': validation_refusal,
+        }
+    
     def _get_validations_queryset(self, date_from: datetime = None, date_to: datetime = None):
         """Get base queryset for validations filtered by agent ID."""
         # Filter strictly by the agent who performed the validation
@@ -736,12 +892,15 @@ class CustomsReportsService:
     def _get_refunds_queryset(self, date_from: datetime = None, date_to: datetime = None):
         """Get base queryset for refunds filtered by agent ID."""
         # Refunds are linked to forms that were validated by this agent
-        # OR refunds that were initiated/collected by this agent
+        # OR refunds that were initiated/collected by this agent.
+        # Every join here is one-to-one or a foreign key, so no refund can
+        # appear twice and no distinct() is needed (it would also force
+        # aggregates into a subquery).
         queryset = Refund.objects.filter(
             Q(form__customs_validation__agent_id=self.agent_id) |
             Q(initiated_by_id=self.agent_id) |
             Q(cash_collected_by_id=self.agent_id)
-        ).distinct()
+        )
         
         if date_from:
             queryset = queryset.filter(created_at__gte=date_from)
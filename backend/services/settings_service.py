@@ -2,10 +2,18 @@
 Service for accessing system settings throughout the application.
 """
 from django.core.cache import cache
+from django.db import DatabaseError
 import json
+import time
 
 
 SETTINGS_CACHE_KEY = 'system_settings'
+SETTINGS_REVISION_KEY = 'system_settings_rev'
+SETTINGS_CACHE_TIMEOUT = 60 * 60  # 1 hour
+
+# Per-process copy in front of the shared cache, as (expires_at, settings)
+_SETTINGS_LOCAL = (0.0, None)
+_SETTINGS_LOCAL_TTL = 30  # seconds
 
 DEFAULT_SETTINGS = {
     'general': {
@@ -54,37 +62,88 @@ class SettingsService:
     
     @staticmethod
     def get_all_settings():
-        """Get all system settings."""
-        # Try cache first
-        cached = cache.get(SETTINGS_CACHE_KEY)
-        if cached:
-            return cached
+        """
+        Get all system settings.
+        
+        Notification and security checks read settings several times per
+        request, so each process keeps its own copy for a few seconds instead
+        of asking the cache backend every time. A change is visible at once
+        in the process that saved it. Other processes only see it through a
+        shared cache backend (within _SETTINGS_LOCAL_TTL); with the default
+        per-process memory cache they keep the old settings until their
+        entry expires after SETTINGS_CACHE_TIMEOUT.
+        """
+        global _SETTINGS_LOCAL
+        now = time.monotonic()
+        expires_at, settings_data = _SETTINGS_LOCAL
+        if now < expires_at:
+            return settings_data
         
-        # Try database
         try:
-            from django.apps import apps
-            SystemSetting = apps.get_model('accounts', 'SystemSetting')
-            setting = SystemSetting.objects.filter(key='system_settings').first()
-            if setting:
-                settings_data = json.loads(setting.value)
-                cache.set(SETTINGS_CACHE_KEY, settings_data, 3600)
-                return settings_data
-        except Exception:
-            pass
+            settings_data = cache.get_or_set(
+                SettingsService.get_cache_key(), SettingsService._load_settings, SETTINGS_CACHE_TIMEOUT
+            )
+        except DatabaseError:
+            # Table not there yet (fresh install, migrations), don't cache the defaults
+            return DEFAULT_SETTINGS.copy()
+        
+        _SETTINGS_LOCAL = (now + _SETTINGS_LOCAL_TTL, settings_data)
+        return settings_data
+    
+    @staticmethod
+    def get_cache_key():
+        """
+        Cache key of the current settings revision.
         
+        Bumping the revision moves readers to a new key, so a settings change
+        is one cache write whatever the cache backend. The first revision is
+        time based so an evicted counter never resurrects an older entry.
+        """
+        revision = cache.get_or_set(SETTINGS_REVISION_KEY, lambda: int(time.time()), None)
+        return f"{SETTINGS_CACHE_KEY}:{revision}"
+    
+    @staticmethod
+    def bump_settings_revision():
+        """Invalidate cached settings after they changed."""
+        global _SETTINGS_LOCAL
+        _SETTINGS_LOCAL = (0.0, None)
+        try:
+            cache.incr(SETTINGS_REVISION_KEY)
+        except ValueError:
+            # Counter evicted, start a fresh revision
+            cache.set(SETTINGS_REVISION_KEY, int(time.time()), None)
+    
+    @staticmethod
+    def _load_settings():
+        """Stored settings, or the defaults when none were saved yet."""
+        from django.apps import apps
+        SystemSetting = apps.get_model('accounts', 'SystemSetting')
+        setting = SystemSetting.objects.filter(key='system_settings').first()
+        if setting:
+            return json.loads(setting.value)
         return DEFAULT_SETTINGS.copy()
     
     @staticmethod
     def get_section(section_name):
         """Get a specific section of settings."""
-        all_settings = SettingsService.get_all_settings()
-        return all_settings.get(section_name, DEFAULT_SETTINGS.get(section_name, {}))
+        section = SettingsService.get_all_settings().get(section_name)
+        if section is None:
+            section = DEFAULT_SETTINGS.get(section_name, {})
+        return section
     
     @staticmethod
     def get_setting(section_name, key, default=None):
         """Get a specific setting value."""
-        section = SettingsService.get_section(section_name)
-        return section.get(key, default)
+        return SettingsService.get_section(section_name).get(key, default)
+    
+    @staticmethod
+    def _email_notification_enabled(key):
+        """Check email notifications and one of their triggers from the same section read."""
+        notifications = SettingsService.get_section('notifications')
+        return (
+            notifications.get('email_notifications_enabled', True) and
+            notifications.get(key, True)
+        )
     
     @staticmethod
     def is_email_notifications_enabled():
@@ -99,34 +158,22 @@ class SettingsService:
     @staticmethod
     def should_notify_on_form_created():
         """Check if notifications should be sent on form creation."""
-        return (
-            SettingsService.is_email_notifications_enabled() and
-            SettingsService.get_setting('notifications', 'notify_on_form_created', True)
-        )
+        return SettingsService._email_notification_enabled('notify_on_form_created')
     
     @staticmethod
     def should_notify_on_validation():
         """Check if notifications should be sent on validation."""
-        return (
-            SettingsService.is_email_notifications_enabled() and
-            SettingsService.get_setting('notifications', 'notify_on_validation', True)
-        )
+        return SettingsService._email_notification_enabled('notify_on_validation')
     
     @staticmethod
     def should_notify_on_refund():
         """Check if notifications should be sent on refund."""
-        return (
-            SettingsService.is_email_notifications_enabled() and
-            SettingsService.get_setting('notifications', 'notify_on_refund', True)
-        )
+        return SettingsService._email_notification_enabled('notify_on_refund')
     
     @staticmethod
     def should_notify_admins_on_high_risk():
         """Check if admins should be notified on high risk."""
-        return (
-            SettingsService.is_email_notifications_enabled() and
-            SettingsService.get_setting('notifications', 'notify_admins_on_high_risk', True)
-        )
+        return SettingsService._email_notification_enabled('notify_admins_on_high_risk')
     
     # ==================== SECURITY SETTINGS ====================
     
@@ -1,8 +1,9 @@
 """
 Tax Free Form business logic service.
 """
+import calendar
 from decimal import Decimal
-from datetime import timedelta
+from datetime import date, timedelta
 from django.utils import timezone
 
 from apps.taxfree.models import TaxFreeForm, Traveler, TaxFreeFormStatus
@@ -27,36 +28,33 @@ class TaxFreeService:
             TaxFreeForm instance
         """
         # Get active ruleset
-        ruleset = RuleSet.get_active()
+        ruleset = RuleSet.get_active_with_risk_rules()
         if not ruleset:
             raise ValueError("No active ruleset configured")
         
+        # Load the items once; every step below reads the same list
+        items = list(invoice.items.all())
+        
         # Check eligibility
-        eligibility = cls.check_eligibility(invoice, traveler, ruleset)
+        eligibility = cls.check_eligibility(invoice, traveler, ruleset, items)
         if not eligibility['eligible']:
             raise ValueError(f"Not eligible: {', '.join(eligibility['reasons'])}")
         
         # Mark items as eligible/ineligible based on excluded categories
-        cls.update_items_eligibility(invoice, ruleset)
-        
-        # Pre-calculate refund to check if it's positive
-        pre_vat = cls.calculate_vat_amount(invoice, ruleset)
-        pre_fee = cls.calculate_operator_fee(pre_vat, ruleset)
-        pre_refund = pre_vat - pre_fee
-        if pre_refund <= 0:
-            raise ValueError(f"Not eligible: Refund amount is zero or negative (fees {pre_fee} CDF exceed VAT {pre_vat} CDF)")
-        
-        # Calculate amounts
-        eligible_amount = cls.calculate_eligible_amount(invoice, ruleset)
-        vat_amount = cls.calculate_vat_amount(invoice, ruleset)
+        cls.update_items_eligibility(invoice, ruleset, items)
+        
+        # Calculate amounts, refusing forms whose fees exceed the VAT
+        eligible_amount, vat_amount = cls.calculate_totals(invoice, ruleset, items)
         operator_fee = cls.calculate_operator_fee(vat_amount, ruleset)
         refund_amount = vat_amount - operator_fee
+        if refund_amount <= 0:
+            raise ValueError(f"Not eligible: Refund amount is zero or negative (fees {operator_fee} CDF exceed VAT {vat_amount} CDF)")
         
         # Calculate expiry
         expires_at = timezone.now() + timedelta(days=ruleset.exit_deadline_months * 30)
         
         # Calculate risk score
-        risk_score, risk_flags = cls.calculate_risk(invoice, traveler, ruleset)
+        risk_score, risk_flags = cls.calculate_risk(invoice, traveler, ruleset, items)
         requires_control = (
             risk_score >= ruleset.risk_score_threshold or
             eligible_amount >= ruleset.high_value_threshold
@@ -83,27 +81,32 @@ class TaxFreeService:
         return form
     
     @classmethod
-    def check_eligibility(cls, invoice, traveler, ruleset):
+    def check_eligibility(cls, invoice, traveler, ruleset, items=None):
         """
         Check if invoice/traveler combination is eligible for tax free.
         
+        Args:
+            items: Already loaded invoice items, queried when omitted
+        
         Returns:
             dict with 'eligible' bool and 'reasons' list
         """
         reasons = []
         
         # Check minimum purchase amount
-        eligible_amount = cls.calculate_eligible_amount(invoice, ruleset)
+        eligible_amount = cls.calculate_eligible_amount(invoice, ruleset, items)
         if eligible_amount < ruleset.min_purchase_amount:
             reasons.append(f"Amount below minimum ({ruleset.min_purchase_amount} CDF required, got {eligible_amount} CDF)")
         
         # Check traveler age
-        from dateutil.relativedelta import relativedelta
-        from datetime import date
         dob = traveler.date_of_birth
         if isinstance(dob, str):
             dob = date.fromisoformat(dob)
-        age = relativedelta(timezone.now().date(), dob).years
+        today = timezone.now().date()
+        birthday = (dob.month, dob.day)
+        if birthday == (2, 29) and not calendar.isleap(today.year):
+            birthday = (2, 28)  # same convention as dateutil's relativedelta
+        age = today.year - dob.year - ((today.month, today.day) < birthday)
         if age < ruleset.min_age:
             reasons.append(f"Traveler below minimum age ({ruleset.min_age})")
         
@@ -124,8 +127,14 @@ class TaxFreeService:
         if invoice.is_cancelled:
             reasons.append("Invoice is cancelled")
         
-        # Check no existing form
-        if hasattr(invoice, 'taxfree_form'):
+        # Check no existing form. Free when the caller selected the
+        # reverse relation, one lookup otherwise; unlike hasattr() this
+        # does not swallow unrelated AttributeErrors.
+        try:
+            invoice.taxfree_form
+        except TaxFreeForm.DoesNotExist:
+            pass
+        else:
             reasons.append("Invoice already has a tax free form")
         
         return {
@@ -134,34 +143,37 @@ class TaxFreeService:
         }
     
     @classmethod
-    def calculate_eligible_amount(cls, invoice, ruleset):
-        """Calculate eligible amount from invoice items."""
-        total = Decimal('0.00')
+    def calculate_totals(cls, invoice, ruleset, items=None):
+        """
+        Calculate eligible amount and VAT amount in one pass over the items.
         
-        for item in invoice.items.all():
+        Returns:
+            tuple of (eligible_amount, vat_amount)
+        """
+        excluded_categories = set(ruleset.excluded_categories or [])
+        eligible_total = Decimal('0.00')
+        vat_total = Decimal('0.00')
+        
+        for item in (invoice.items.all() if items is None else items):
             # Skip excluded categories
-            if item.product_category in ruleset.excluded_categories:
+            if item.product_category in excluded_categories:
                 continue
             if not item.is_eligible:
                 continue
-            total += item.line_total
+            eligible_total += item.line_total
+            vat_total += item.vat_amount
         
-        return total
+        return eligible_total, vat_total
     
     @classmethod
-    def calculate_vat_amount(cls, invoice, ruleset):
+    def calculate_eligible_amount(cls, invoice, ruleset, items=None):
+        """Calculate eligible amount from invoice items."""
+        return cls.calculate_totals(invoice, ruleset, items)[0]
+    
+    @classmethod
+    def calculate_vat_amount(cls, invoice, ruleset, items=None):
         """Calculate VAT amount from eligible items."""
-        total = Decimal('0.00')
-        
-        for item in invoice.items.all():
-            # Skip excluded categories
-            if item.product_category in ruleset.excluded_categories:
-                continue
-            if not item.is_eligible:
-                continue
-            total += item.vat_amount
-        
-        return total
+        return cls.calculate_totals(invoice, ruleset, items)[1]
     
     @classmethod
     def calculate_operator_fee(cls, vat_amount, ruleset):
@@ -176,7 +188,7 @@ class TaxFreeService:
         return total_fee.quantize(Decimal('0.01'))
     
     @classmethod
-    def calculate_risk(cls, invoice, traveler, ruleset):
+    def calculate_risk(cls, invoice, traveler, ruleset, items=None):
         """
         Calculate risk score and flags.
         
@@ -192,11 +204,11 @@ class TaxFreeService:
             'traveler_country': traveler.residence_country,
             'traveler_nationality': traveler.nationality,
             'merchant_id': str(invoice.merchant.id),
-            'items_count': invoice.items.count(),
+            'items_count': invoice.items.count() if items is None else len(items),
         }
         
         # Evaluate risk rules
-        for rule in ruleset.risk_rules.filter(is_active=True):
+        for rule in ruleset.active_risk_rules:
             rule_score = rule.evaluate(context)
             if rule_score > 0:
                 score += rule_score
@@ -219,19 +231,20 @@ class TaxFreeService:
         return score, flags
     
     @classmethod
-    def update_items_eligibility(cls, invoice, ruleset):
+    def update_items_eligibility(cls, invoice, ruleset, items=None):
         """
         Update each item's is_eligible and ineligibility_reason based on ruleset.
         This ensures the eligibility status is persisted in the database.
         """
-        excluded_categories = ruleset.excluded_categories or []
+        excluded_categories = {c.upper() for c in (ruleset.excluded_categories or [])}
         
-        for item in invoice.items.all():
+        changed = []
+        for item in (invoice.items.all() if items is None else items):
             is_eligible = True
             reason = ''
             
             # Check if category is excluded
-            if item.product_category and item.product_category.upper() in [c.upper() for c in excluded_categories]:
+            if item.product_category and item.product_category.upper() in excluded_categories:
                 is_eligible = False
                 reason = 'Catégorie exclue de la détaxe'
             
@@ -239,8 +252,10 @@ class TaxFreeService:
             if item.is_eligible != is_eligible or item.ineligibility_reason != reason:
                 item.is_eligible = is_eligible
                 item.ineligibility_reason = reason
-                # Use update to avoid triggering save() which recalculates totals
-                type(item).objects.filter(pk=item.pk).update(
-                    is_eligible=is_eligible,
-                    ineligibility_reason=reason
-                )
+                changed.append(item)
+        
+        # bulk_update skips save(), which would recalculate totals
+        if changed:
+            type(changed[0]).objects.bulk_update(
+                changed, ['is_eligible', 'ineligibility_reason'], batch_size=500
+            )
@@ -12,6 +12,12 @@ from apps.customs.models import PointOfExit
 from apps.rules.models import RuleSet
 
 
+@pytest.fixture(autouse=True)
+def fast_password_hasher(settings):
+    """Use a cheap password hasher; PBKDF2 dominates fixture setup otherwise."""
+    settings.PASSWORD_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+
+
 @pytest.fixture
 def admin_user(db):
     """Create an admin user."""
@@ -34,7 +40,7 @@ def merchant_user(db, merchant):
         first_name='Merchant',
         last_name='User',
         role=UserRole.MERCHANT,
-        merchant=merchant
+        merchant_id=merchant.id
     )
 
 
@@ -47,7 +53,7 @@ def customs_agent(db, point_of_exit):
         first_name='Customs',
         last_name='Agent',
         role=UserRole.CUSTOMS_AGENT,
-        point_of_exit=point_of_exit
+        point_of_exit_id=point_of_exit.id
     )
 
 
@@ -136,3 +142,12 @@ def authenticated_client(api_client, admin_user):
     """Create authenticated API client."""
     api_client.force_authenticate(user=admin_user)
     return api_client
+
+
+@pytest.fixture
+def fresh_settings_cache():
+    """Drop cached system settings before and after the test."""
+    from services.settings_service import SettingsService
+    SettingsService.bump_settings_revision()
+    yield
+    SettingsService.bump_settings_revision()
@@ -108,6 +108,25 @@ class TestRulesAPI:
         assert response.data['version'] == '2.0.0'
 
 
+@pytest.mark.django_db
+class TestSettingsAPI:
+    """Tests for system settings endpoints."""
+    
+    def test_update_settings_invalidates_cache(self, authenticated_client, fresh_settings_cache):
+        """Test that updated settings are read back instead of the cached copy."""
+        from services.settings_service import SettingsService
+        
+        # Cache the current settings
+        assert SettingsService.get_all_settings()['general']['company_name'] == 'Tax Free RDC'
+        
+        response = authenticated_client.put('/api/settings/system/', {
+            'general': {'company_name': 'Tax Free RDC Test'}
+        }, format='json')
+        
+        assert response.status_code == status.HTTP_200_OK
+        assert SettingsService.get_all_settings()['general']['company_name'] == 'Tax Free RDC Test'
+
+
 @pytest.mark.django_db
 class TestReportsAPI:
     """Tests for reporting endpoints."""